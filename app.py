@@ -1,6 +1,10 @@
 import os
+import pandas as pd
 import streamlit as st
+from src import metrics
 from src.agent import FinancialTweetAgent
+from src.response_cache import default_cache
+from src.vector_db import TITAN_BREAKER
 from src.plotting import build_sentiment_bar
 
 # ──────────────────────────────────────────────────────────────────
@@ -12,10 +16,18 @@ st.title("💸 Financial-Tweet Agent")
 # Bucket S3 para sincronizar
 bucket_name = os.getenv("BUCKET_NAME")          # debe venir en variables de entorno
 
-# Crea / recupera el agente en la sesión
-if "agent" not in st.session_state:
-    st.session_state.agent = FinancialTweetAgent()
-agent: FinancialTweetAgent = st.session_state.agent
+# Un agente por proceso, compartido entre sesiones (mismo chroma_db en disco)
+# Con SNAPSHOT_URI el agente arranca desde el snapshot y sólo aplica los deltas de S3
+snapshot_uri = os.getenv("SNAPSHOT_URI")
+
+@st.cache_resource
+def load_agent(snapshot_uri: str | None, bucket_name: str | None) -> FinancialTweetAgent:
+    agent = FinancialTweetAgent(snapshot_uri)
+    if snapshot_uri and bucket_name:
+        agent.ingest_s3_prefix(bucket_name)
+    return agent
+
+agent: FinancialTweetAgent = load_agent(snapshot_uri, bucket_name)
 
 # ──────────────────────────────────────────────────────────────────
 # Sidebar – carga de datos
@@ -28,6 +40,12 @@ if bucket_name and st.sidebar.button("🔄 Sincronizar S3"):
         agent.ingest_s3_prefix(bucket_name)          # añade nuevos registros
     st.sidebar.success("✅ Datos sincronizados")
 
+# 1b) Publicar snapshot del índice para los siguientes despliegues
+if snapshot_uri and not agent.df.empty and st.sidebar.button("💾 Guardar snapshot"):
+    with st.spinner("Exportando snapshot…"):
+        agent.save_snapshot(snapshot_uri)
+    st.sidebar.success("✅ Snapshot publicado")
+
 # 2) Subir archivo local (Parquet)
 uploaded = st.sidebar.file_uploader("o sube un archivo .parquet", type="parquet")
 if uploaded is not None:
@@ -35,6 +53,20 @@ if uploaded is not None:
         agent.ingest(uploaded)
     st.sidebar.success("✅ Archivo cargado")
 
+# 3) Diagnóstico de invocaciones a Bedrock
+with st.sidebar.expander("🩺 Diagnóstico Bedrock"):
+    rows = metrics.snapshot()
+    if rows:
+        st.dataframe(pd.DataFrame(rows).set_index("model_id").T, use_container_width=True)
+    else:
+        st.caption("Sin invocaciones todavía.")
+    cache = default_cache().stats()
+    st.caption(f"Caché: {cache['entries']} entradas · hit rate {cache['hit_rate']:.0%}")
+    gauges = metrics.gauges()            # circuit.<nombre>: 0 closed · 1 half_open · 2 open
+    if gauges:
+        st.caption(" · ".join(f"{k} = {v:g}" for k, v in sorted(gauges.items())))
+    st.caption(f"Circuito Titan: {TITAN_BREAKER.state}")
+
 # Si aún no hay datos, muestra aviso y detiene
 if agent.df.empty:
     st.info("Aún no hay tweets cargados. Sincroniza S3 o sube un Parquet para continuar.")
@@ -83,7 +115,21 @@ with tab_dash:
 with tab_chat:
     st.subheader("Haz una pregunta sobre los tweets almacenados")
     query = st.text_input("Pregunta", placeholder="¿Qué opinan sobre la fortaleza financiera de BBVA?")
+    # el periodo sólo filtra con particiones temporales (VECTOR_PARTITION): sin ellas se oculta
+    days = None
+    if agent.db.partition:
+        window = st.selectbox("Periodo", ["Todo", "Últimos 7 días", "Últimos 30 días", "Últimos 90 días"])
+        days = {"Últimos 7 días": 7, "Últimos 30 días": 30, "Últimos 90 días": 90}.get(window)
+    start = pd.Timestamp.now("UTC") - pd.Timedelta(days=days) if days else None
     if query:
+        stats: dict = {}
         with st.spinner("Consultando corpus…"):
-            answer = agent.insight_hist(query)
-        st.write(answer)
+            stream = agent.insight_hist_stream(query, start=start, stats=stats)
+        st.write_stream(stream)
+        if "ttft_s" in stats:
+            ctx = stats.get("context", {})
+            st.caption(
+                f"Primer token: {stats['ttft_s']:.2f} s · respuesta completa: {stats['total_s']:.2f} s"
+                f" · contexto: {ctx.get('snippets', 0)} tweets, ~{ctx.get('tokens', 0)} tokens"
+                f" (sin empaquetar ~{ctx.get('raw_tokens', 0)})"
+            )
@@ -6,7 +6,8 @@ import matplotlib
 import boto3
 import s3fs
 from io import BytesIO
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+import re
 import time
 
 os.environ["MPLCONFIGDIR"] = "/tmp"
@@ -15,10 +16,18 @@ matplotlib.use("Agg")
 S3 = boto3.client("s3")
 fs = s3fs.S3FileSystem()
 BUCKET = os.environ["BUCKET_NAME"]
+ENTITY = os.getenv("ENTITY", "BBVA")          # partición entity= que escribe el Lambda de ingesta
+PLOT_HOURS = int(os.getenv("PLOT_HOURS", "72"))   # ventana por defecto (horas de created_at)
+# Datos anteriores a entity=/hora de evento: tweets/year=…/hour=<hora de INGESTA>/.
+# Se siguen leyendo para esta entidad mientras no se migren; "" lo desactiva.
+LEGACY_ENTITY = os.getenv("LEGACY_ENTITY", "BBVA")
+LEGACY_LAG = timedelta(days=7)   # search_recent: un tweet se ingiere ≤ 7 días después de creado
+
+HOUR_RE = re.compile(r"year=(\d{4})/month=(\d{2})/day=(\d{2})/hour=(\d{2})/")
 
 # ── Listar todos los archivos parquet ─────────────────────────────
 def list_all_parquet_keys(bucket, prefix):
-    paginator = boto3.client("s3").get_paginator("list_objects_v2")
+    paginator = S3.get_paginator("list_objects_v2")
     page_iterator = paginator.paginate(Bucket=bucket, Prefix=prefix)
 
     keys = []
@@ -28,22 +37,72 @@ def list_all_parquet_keys(bucket, prefix):
                 keys.append(obj["Key"])
     return keys
 
-# ── Cargar últimos 30 archivos ───────────────────────────────────
-def load_all_tweets():
-    keys = list_all_parquet_keys(BUCKET, prefix="tweets/")
-    print(f"Total .parquet encontrados: {len(keys)}")
-    keys = sorted(keys)[-30:]
+# ── Poda por hora de evento ──────────────────────────────────────
+def day_prefixes(start, end, root=f"tweets/entity={ENTITY}/"):
+    """Un prefijo year=/month=/day= por cada día UTC del rango."""
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day <= end:
+        yield f"{root}year={day.year}/month={day.month:02d}/day={day.day:02d}/"
+        day += timedelta(days=1)
+
+def key_in_range(key, start, end):
+    m = HOUR_RE.search(key)
+    if not m:
+        return False
+    hour = datetime(*map(int, m.groups()), tzinfo=timezone.utc)
+    return hour + timedelta(hours=1) > start and hour <= end
+
+def legacy_keys(start, end):
+    """
+    Keys del layout anterior que pueden tener tweets del rango. Su hour= es la de
+    ingesta (≥ created_at), así que sólo poda por abajo; por arriba alcanza
+    hasta LEGACY_LAG después de `end`. El filtro por created_at hace el resto.
+    """
+    if not LEGACY_ENTITY or LEGACY_ENTITY != ENTITY:
+        return []
+    last = min(end + LEGACY_LAG, datetime.now(timezone.utc))
+    keys = []
+    for prefix in day_prefixes(start, last, root="tweets/"):
+        for k in list_all_parquet_keys(BUCKET, prefix):
+            m = HOUR_RE.search(k)
+            if m and datetime(*map(int, m.groups()), tzinfo=timezone.utc) + timedelta(hours=1) > start:
+                keys.append(k)
+    return keys
+
+def footer_in_range(meta, start, end):
+    """Descarta el archivo con created_at_min/max del footer, sin leer datos."""
+    kv = meta.metadata or {}
+    if b"created_at_min" not in kv:
+        return True
+    lo = datetime.fromisoformat(kv[b"created_at_min"].decode())
+    hi = datetime.fromisoformat(kv[b"created_at_max"].decode())
+    return hi >= start and lo <= end
+
+# ── Cargar tweets de la ventana [start, end] ─────────────────────
+def load_tweets(start, end):
+    keys = [k for prefix in day_prefixes(start, end)
+            for k in list_all_parquet_keys(BUCKET, prefix) if key_in_range(k, start, end)]
+    legacy = legacy_keys(start, end)
+    print(f"Parquets en rango: {len(keys)} (+{len(legacy)} del layout anterior)")
+    keys += legacy
 
     tables = []
     for k in keys:
         try:
             with fs.open(f"s3://{BUCKET}/{k}") as f:
-                tables.append(pq.read_table(f))
+                if not footer_in_range(pq.read_metadata(f), start, end):
+                    continue
+                f.seek(0)
+                # las estadísticas min/max por row group saltan los que quedan fuera
+                tables.append(pq.read_table(f, filters=[("created_at", ">=", start),
+                                                        ("created_at", "<=", end)]))
         except Exception as e:
             print(f"Error leyendo {k}: {e}")
     if not tables:
         return pd.DataFrame()
-    return pd.concat([t.to_pandas() for t in tables], ignore_index=True)
+    df = pd.concat([t.to_pandas() for t in tables], ignore_index=True)
+    # Un reintento del Lambda de ingesta puede repetir tweets
+    return df.drop_duplicates("tweet_id") if "tweet_id" in df.columns else df
 
 # ── Función para graficar tendencias ─────────────────────────────
 def build_trend_plot(df, filename):
@@ -89,7 +148,11 @@ def build_trend_plot(df, filename):
 # ── Lambda handler principal ─────────────────────────────────────
 def lambda_handler(event, context):
     t0 = time.time()
-    df = load_all_tweets()
+    event = event or {}
+    end = datetime.fromisoformat(event["end"]) if "end" in event else datetime.now(timezone.utc)
+    start = datetime.fromisoformat(event["start"]) if "start" in event else end - timedelta(hours=PLOT_HOURS)
+    start, end = (t if t.tzinfo else t.replace(tzinfo=timezone.utc) for t in (start, end))
+    df = load_tweets(start, end)
     print(f"Datos cargados: {len(df)} filas")
 
     if df.empty or "sentiment" not in df.columns:
@@ -0,0 +1,69 @@
+"""
+Checkpoint de la clasificación de una ejecución del Lambda.
+
+Cada lote terminado sube sus etiquetas ({tweet_id: etiqueta}) como un objeto
+propio, `s3://BUCKET/staging/runs/<run_id>/labels-<uuid>.json`, fuera del
+lock: los workers no se serializan tras un PUT y cada byte se sube una vez.
+Si la invocación falla y se reintenta con el mismo run_id
+(`context.aws_request_id` en los reintentos asíncronos de Lambda, o `run_id`
+en el evento), se listan y unen esos objetos y sólo se clasifican los tweets
+sin etiqueta. Al terminar bien se borra el prefijo.
+
+Una ejecución que agota sus reintentos deja su prefijo atrás: el bucket
+necesita una regla de ciclo de vida que expire `staging/` (p. ej. 7 días).
+"""
+import json
+import threading
+import uuid
+
+from aws_clients import get_client
+
+STAGING_PREFIX = "staging/runs"
+
+
+class Checkpoint:
+    def __init__(self, bucket: str, run_id: str, prefix: str = STAGING_PREFIX):
+        self.bucket = bucket
+        self.prefix = f"{prefix}/{run_id}/"
+        self._lock = threading.Lock()
+        self.labels: dict[str, str] = self._load()
+        self.resumed = len(self.labels)
+
+    def _keys(self) -> list[str]:
+        pages = get_client("s3").get_paginator("list_objects_v2").paginate(
+            Bucket=self.bucket, Prefix=self.prefix)
+        return [o["Key"] for page in pages for o in page.get("Contents", [])]
+
+    def _load(self) -> dict:
+        s3 = get_client("s3")
+        labels: dict[str, str] = {}
+        for key in self._keys():
+            try:
+                labels.update(json.loads(s3.get_object(Bucket=self.bucket, Key=key)["Body"].read()))
+            except s3.exceptions.NoSuchKey:       # borrado por un clear() concurrente
+                continue
+        return labels
+
+    def get(self, tweet_id) -> str | None:
+        return self.labels.get(str(tweet_id))
+
+    def record(self, labels: dict) -> None:
+        """Añade {tweet_id: etiqueta} y sube sólo este lote (thread-safe)."""
+        if not labels:
+            return
+        batch = {str(k): v for k, v in labels.items()}
+        with self._lock:
+            self.labels.update(batch)
+        key = f"{self.prefix}labels-{uuid.uuid4().hex}.json"
+        try:
+            get_client("s3").put_object(Bucket=self.bucket, Key=key, Body=json.dumps(batch).encode(),
+                                        ContentType="application/json")
+        except Exception as e:          # un checkpoint perdido sólo cuesta re-clasificar
+            print(f"checkpoint {key} no guardado: {e}")
+
+    def clear(self) -> None:
+        s3, keys = get_client("s3"), self._keys()
+        for i in range(0, len(keys), 1000):       # máximo por DeleteObjects
+            s3.delete_objects(Bucket=self.bucket,
+                              Delete={"Objects": [{"Key": k} for k in keys[i:i + 1000]],
+                                      "Quiet": True})
@@ -0,0 +1,184 @@
+"""
+Clasificación de sentimiento con Bedrock para el Lambda de ingesta.
+
+• bedrock_sentiment(text)       → una etiqueta por invocación.
+• classify_batch(texts, k)      → K tweets por invocación con ids; pide un
+  array JSON estricto, valida/repara la salida y re-consulta sólo los ids
+  que no se pudieron leer. Los lotes corren en paralelo bajo el límite de
+  tasa compartido de `rate_limit`.
+"""
+import json
+import os
+import re
+import time
+
+import botocore
+
+import metrics
+from aws_clients import get_client
+from model_routing import CLASSIFY_PROMPT, anthropic_body, route
+from rate_limit import LIMITER, run_ordered
+from response_cache import default_cache, is_cacheable
+
+BEDROCK_REGION = os.getenv("BEDROCK_REGION", "us-east-1")
+CLASSIFY = route("classify")                   # modelo barato/rápido para etiquetas
+MODEL_ID = CLASSIFY["model_id"]
+BATCH_SIZE = int(os.getenv("CLASSIFY_BATCH_SIZE", "15"))
+LABELS = ("positive", "neutral", "negative")
+
+BATCH_PROMPT = (
+    "Clasifica el **sentimiento** de cada tweet en español como "
+    "'positive', 'neutral' o 'negative'.\n"
+    "Responde SOLO con un array JSON, un objeto por tweet y en el mismo orden: "
+    '[{{"id": 1, "sentiment": "positive"}}, ...]\n\n'
+    "Tweets:\n{items}"
+)
+_PAIR = re.compile(r'"id"\s*:\s*"?(\d+)"?\s*,\s*"sentiment"\s*:\s*"(\w+)"')
+
+
+# ── Invocación con caché, reintentos y métricas ──────────────────
+def invoke(body: dict, max_retries: int = 5) -> dict:
+    # temperature 0 → determinista: un reintento o re-ejecución no vuelve a Bedrock;
+    # con otra temperatura (MODEL_ROUTES) no se cachea, igual que en src/bedrock_client
+    t0 = time.perf_counter()
+    cacheable = is_cacheable(body, None)
+    cached = default_cache().get(MODEL_ID, body) if cacheable else None
+    if cached is not None:
+        metrics.record_invocation(MODEL_ID, time.perf_counter() - t0, cache_hit=True)
+        return cached
+
+    # max_attempts=1: este bucle es la única capa de reintentos, así cada throttle
+    # pasa por LIMITER.backoff (pausa coordinada) en vez de por botocore
+    runtime = metrics.instrument(get_client("bedrock-runtime", BEDROCK_REGION, max_attempts=1))
+    metrics.take_throttles()
+    retries = throttles = 0
+    for attempt in range(max_retries):
+        LIMITER.acquire()
+        try:
+            resp = runtime.invoke_model(
+                modelId=MODEL_ID,
+                body=json.dumps(body),
+                accept="application/json",
+                contentType="application/json"
+            )
+            result = json.loads(resp["body"].read())
+            usage = result.get("usage", {})
+            metrics.record_invocation(
+                MODEL_ID, time.perf_counter() - t0,
+                usage.get("input_tokens"), usage.get("output_tokens"),
+                retries=retries + resp["ResponseMetadata"].get("RetryAttempts", 0),
+                throttles=throttles + metrics.take_throttles(),
+            )
+            if cacheable:
+                default_cache().put(MODEL_ID, body, result)
+            return result
+        except botocore.exceptions.ClientError as e:
+            # el hook de métricas ya contó el throttle de este intento
+            throttles += metrics.take_throttles()
+            retries += e.response.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+            if e.response["Error"]["Code"] == "ThrottlingException" and attempt < max_retries - 1:
+                retries += 1
+                LIMITER.backoff(2 ** attempt)          # frena a todos los workers
+                continue
+            metrics.record_invocation(MODEL_ID, time.perf_counter() - t0,
+                                      retries=retries, throttles=throttles)
+            raise
+
+
+def _text(result: dict) -> str:
+    return result["content"][0]["text"]
+
+
+# ── Un tweet por invocación ───────────────────────────────────────
+def bedrock_sentiment(text: str, max_retries: int = 5) -> str:
+    prompt = CLASSIFY_PROMPT.format(text=text.replace(chr(10), ' '))
+    body = anthropic_body(prompt, CLASSIFY["max_tokens"], CLASSIFY["temperature"])
+    return _text(invoke(body, max_retries)).strip().split()[0].lower()
+
+
+# ── K tweets por invocación ──────────────────────────────────────
+def parse_batch(raw: str, n: int) -> dict[int, str]:
+    """
+    {id: etiqueta} con sólo ids 1..n y etiquetas válidas. Primero intenta el
+    array JSON completo; si está truncado o mal formado, rescata los pares
+    id/sentiment que sí se puedan leer.
+    """
+    pairs = []
+    start, end = raw.find("["), raw.rfind("]")
+    try:
+        items = json.loads(raw[start : end + 1]) if start != -1 and end > start else None
+        pairs = [(int(it["id"]), str(it["sentiment"])) for it in items]
+    except (ValueError, TypeError, KeyError):
+        pairs = [(int(i), s) for i, s in _PAIR.findall(raw)]
+    out = {}
+    for i, label in pairs:
+        label = label.strip().lower()
+        if 1 <= i <= n and label in LABELS:
+            out.setdefault(i, label)
+    return out
+
+
+def _classify_chunk(texts: list[str]) -> dict[int, str]:
+    items = "\n".join(f"{i}. «{t.replace(chr(10), ' ')}»" for i, t in enumerate(texts, 1))
+    body = anthropic_body(BATCH_PROMPT.format(items=items),
+                          max_tokens=20 + 15 * len(texts), temperature=CLASSIFY["temperature"])
+    return parse_batch(_text(invoke(body)), len(texts))
+
+
+def classify_batch(texts: list[str], batch_size: int = BATCH_SIZE, max_rounds: int = 2,
+                   on_labels=None) -> tuple[list[str | None], list[tuple[int, str]]]:
+    """
+    (etiquetas en el mismo orden que `texts`, [(índice, error)]).
+    Los ids que fallan al parsear se re-consultan (en lotes, hasta
+    `max_rounds`); los restantes caen a `bedrock_sentiment` uno a uno.
+    Los tweets de un lote que falla se reintentan igual; los que siguen
+    fallando quedan en None y se reportan en la lista de errores sin
+    abortar el resto.
+    on_labels({índice: etiqueta}) se llama (desde el hilo worker) en cuanto
+    cada lote termina, p. ej. para checkpointear el progreso.
+    """
+    labels: list[str | None] = [None] * len(texts)
+    errors: dict[int, str] = {}
+    pending = list(range(len(texts)))
+
+    def run_chunk(ch):
+        got = _classify_chunk([texts[j] for j in ch])
+        if on_labels is not None:
+            on_labels({j: got[pos] for pos, j in enumerate(ch, 1) if pos in got})
+        return got
+
+    def run_single(j):
+        label = bedrock_sentiment(texts[j])
+        if on_labels is not None and label in LABELS:
+            on_labels({j: label})
+        return label
+
+    for _ in range(max_rounds):
+        chunks = [pending[c : c + batch_size] for c in range(0, len(pending), batch_size)]
+        results, failed = run_ordered(run_chunk, chunks)
+        missing = []
+        for ci, err in failed:                 # el lote entero vuelve a intentarse
+            errors.update({j: err for j in chunks[ci]})
+            missing.extend(chunks[ci])
+        for chunk, got in zip(chunks, results):
+            if got is None:
+                continue
+            for pos, j in enumerate(chunk, 1):
+                if pos in got:
+                    labels[j] = got[pos]
+                    errors.pop(j, None)
+                else:
+                    missing.append(j)
+        pending = missing
+        if not pending:
+            break
+
+    singles, failed = run_ordered(run_single, pending)
+    for j, label in zip(pending, singles):
+        labels[j] = label if label in LABELS else None
+        if labels[j] is not None:
+            errors.pop(j, None)
+        elif label is not None:
+            errors[j] = f"etiqueta inválida: {label!r}"
+    errors.update({pending[i]: err for i, err in failed})
+    return labels, sorted(errors.items())
@@ -0,0 +1,106 @@
+"""
+Índice de tweet_id ya escritos, uno por partición diaria (created_at UTC).
+
+Vive en `state/dedup/year=YYYY/month=MM/day=DD/seen_ids.bin`, fuera de
+`tweets/` para que sus PUT no disparen el trigger S3 de la Lambda de gráficas,
+como un arreglo int64 ordenado (8 bytes por id, búsqueda binaria). Se consulta
+antes de clasificar y se actualiza después de escribir el Parquet con PUT
+condicional (If-Match / If-None-Match): si otra ejecución lo cambió entre
+medio, se relee, se une y se reintenta, así no se pierden ids.
+
+If-Match en put_object requiere boto3/botocore ≥ 1.36 (fijado en
+requirements.txt; el boto3 del runtime de Lambda puede ser anterior).
+"""
+import datetime as dt
+from array import array
+from bisect import bisect_left
+
+from botocore.exceptions import ClientError
+
+from aws_clients import get_client
+
+INDEX_NAME = "seen_ids.bin"
+
+
+def index_key(day: dt.date, prefix: str = "state/dedup") -> str:
+    return f"{prefix}/year={day.year}/month={day.month:02d}/day={day.day:02d}/{INDEX_NAME}"
+
+
+def _day(ts) -> dt.date:
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(dt.timezone.utc)
+    return ts.date()
+
+
+class SeenIds:
+    """Arreglo ordenado de ids + ETag del objeto leído (None si no existía)."""
+
+    def __init__(self, ids: array | None = None, etag: str | None = None):
+        self.ids = ids if ids is not None else array("q")
+        self.etag = etag
+
+    def __contains__(self, tweet_id) -> bool:
+        i = bisect_left(self.ids, int(tweet_id))
+        return i < len(self.ids) and self.ids[i] == int(tweet_id)
+
+    def merged(self, new_ids) -> array:
+        return array("q", sorted(set(self.ids).union(int(i) for i in new_ids)))
+
+
+class DedupIndex:
+    def __init__(self, bucket: str, prefix: str = "state/dedup", max_retries: int = 5):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.max_retries = max_retries
+        self._days: dict[dt.date, SeenIds] = {}
+
+    def _fetch(self, day: dt.date) -> SeenIds:
+        s3 = get_client("s3")
+        try:
+            obj = s3.get_object(Bucket=self.bucket, Key=index_key(day, self.prefix))
+        except s3.exceptions.NoSuchKey:
+            return SeenIds()
+        ids = array("q")
+        ids.frombytes(obj["Body"].read())
+        return SeenIds(ids, obj["ETag"])
+
+    def seen(self, day: dt.date) -> SeenIds:
+        if day not in self._days:
+            self._days[day] = self._fetch(day)
+        return self._days[day]
+
+    def filter_new(self, tweets) -> list:
+        """Quita tweets ya indexados y repetidos dentro del propio lote."""
+        out, batch = [], set()
+        for tw in tweets:
+            if tw.id in batch or tw.id in self.seen(_day(tw.created_at)):
+                continue
+            batch.add(tw.id)
+            out.append(tw)
+        return out
+
+    def commit(self, tweets) -> None:
+        """Añade los ids escritos al índice de su día (PUT condicional con reintento)."""
+        by_day: dict[dt.date, list[int]] = {}
+        for tw in tweets:
+            by_day.setdefault(_day(tw.created_at), []).append(tw.id)
+
+        s3 = get_client("s3")
+        for day, ids in by_day.items():
+            for _ in range(self.max_retries):
+                cur = self.seen(day)
+                merged = cur.merged(ids)
+                cond = {"IfMatch": cur.etag} if cur.etag else {"IfNoneMatch": "*"}
+                try:
+                    resp = s3.put_object(Bucket=self.bucket, Key=index_key(day, self.prefix),
+                                         Body=merged.tobytes(), **cond)
+                except ClientError as e:
+                    code = e.response["Error"]["Code"]
+                    if code not in ("PreconditionFailed", "ConditionalRequestConflict"):
+                        raise
+                    self._days[day] = self._fetch(day)   # alguien escribió antes: relee y une
+                    continue
+                self._days[day] = SeenIds(merged, resp["ETag"])
+                break
+            else:
+                raise RuntimeError(f"No se pudo actualizar {index_key(day, self.prefix)}")
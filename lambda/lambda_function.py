@@ -1,145 +1,255 @@
 """
-Lambda ingest: busca tweets sobre «BBVA», clasifica sentimiento
-con Claude-3 Sonnet en Amazon Bedrock y guarda un Parquet NUEVO
-en s3://<BUCKET_NAME>/tweets/… (no se sobrescribe nada).
+Lambda ingest: busca tweets de cada entidad de la watchlist (`watchlist.json`),
+clasifica sentimiento con Claude-3 Sonnet en Amazon Bedrock y guarda Parquets
+NUEVOS en s3://<BUCKET_NAME>/tweets/entity=<NOMBRE>/… (no se sobrescribe nada).
+Al final escribe un único marcador runs/<run_id>/_SUCCESS: es lo que dispara la
+Lambda de gráficas (una vez por ejecución, no una por Parquet).
+
+Un tweet que menciona varias entidades se clasifica una sola vez.
 """
 
-import os, json, time, uuid, tempfile, datetime as dt
-import boto3, botocore
-import pandas as pd
-import pyarrow as pa, pyarrow.parquet as pq
-import tweepy
+import os, json, uuid, datetime as dt
+
+from aws_clients import get_client
+from response_cache import default_cache
+from classifier import classify_batch
+from rate_limit import ENDPOINT_LIMITS, FETCH_WORKERS, RATE_RETRIES, reset_delay, run_ordered
+from watermark import default_store
+from dedup_index import DedupIndex
+from watchlist import load_watchlist
+from term_matcher import fold
+from checkpoint import Checkpoint
 
 # ── Configuración ─────────────────────────────────────────────────
 BUCKET = os.environ["BUCKET_NAME"]
+os.environ.setdefault("METRICS_EMF", "1")      # métricas a CloudWatch vía stdout (EMF)
+os.environ.setdefault("BEDROCK_CACHE_PATH", "/tmp/bedrock_cache.sqlite")   # sólo /tmp es escribible
 
-TW = tweepy.Client(
-    bearer_token=os.environ["TWITTER_BEARER"],
-    wait_on_rate_limit=True
-)
-
-BRUNTIME = boto3.client("bedrock-runtime", region_name="us-east-1")
-MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
-
-FIN_ACCOUNTS = [
-    "@Reuters", "@Bloomberg", "@CNBC", "@FT", "@WSJmarkets"
-]
-
-FUTBOL_TERMS = [
-    "liga", "fútbol", "futbol", "jornada", "torneo", "balón", "balon", "penal",
-    "gol", "partido", "club", "afición", "equipo", "árbitro", "jugador", "estadio",
-    "guard1anes", "apertura", "clausura", "liga mx", "futbolista", "selección",
-    "pumas", "lainez", "reimers", "tigres", "américa", "toluca",
-    "monterrey", "chivas", "atlas", "xolos", "santos", "necaxa", "león", "cruz azul"
-]
-
-APP_TERMS = [
-    "app", "aplicación", "no abre", "no me deja", "error", "fallando",
-    "se cerró", "no puedo entrar", "pantalla blanca", "no inicia", "bug",
-    "actualicé", "crashea", "no funciona", "se traba", "no responde",
-    "login", "contrasena", "transferencia", "cierre inesperado"
-]
+# Cold start: tweepy y pyarrow se importan en el primer uso (no en INIT) y los
+# clientes quedan en globals del módulo para las invocaciones warm.
+_TW = None
 
-# ── Helpers ───────────────────────────────────────────────────────
-def is_futbol_related(text: str) -> bool:
-    text = text.lower()
-    return any(term in text for term in FUTBOL_TERMS)
-
-def is_app_related(text: str) -> bool:
-    text = text.lower()
-    return any(term in text for term in APP_TERMS)
-
-def search_tweets(query: str, n: int):
-    resp = TW.search_recent_tweets(
-        query=query,
-        max_results=min(n, 30),
-        tweet_fields=["id", "text", "created_at", "author_id"]
-    )
-    return resp.data or []
+MAX_TWEETS = int(os.getenv("MAX_TWEETS", "300"))  # tope por query y ejecución
+# Query general de cada entidad: sólo si la de cuentas de noticias no trae nada
+# (como antes); con GENERAL_QUERY_ALWAYS=1 corre siempre → ~2x lecturas en X y Bedrock
+GENERAL_QUERY_ALWAYS = os.getenv("GENERAL_QUERY_ALWAYS", "0") == "1"
 
-def bedrock_sentiment(text: str, max_retries: int = 5) -> str:
-    prompt = (
-        "Clasifica el **sentimiento** del siguiente tweet en español como "
-        "'positive', 'neutral' o 'negative'. Devuelve solo esa palabra.\n\n"
-        f"Tweet: «{text.replace(chr(10), ' ')}»\nSentiment:"
-    )
+ENTITIES = load_watchlist()                       # lambda/watchlist.json (o WATCHLIST_PATH)
 
-    body = json.dumps({
-        "anthropic_version": "bedrock-2023-05-31",
-        "messages": [{"role": "user", "content": prompt}],
-        "max_tokens": 10,
-        "temperature": 0
-    })
-
-    for attempt in range(max_retries):
-        try:
-            resp = BRUNTIME.invoke_model(
-                modelId=MODEL_ID,
-                body=body,
-                accept="application/json",
-                contentType="application/json"
-            )
-            result = json.loads(resp["body"].read())
-            return result["content"][0]["text"].strip().split()[0].lower()
-        except botocore.exceptions.ClientError as e:
-            if e.response["Error"]["Code"] == "ThrottlingException" and attempt < max_retries - 1:
-                time.sleep(2 ** attempt)
-                continue
-            raise
+# ── Helpers ───────────────────────────────────────────────────────
+def twitter():
+    global _TW
+    if _TW is None:
+        import tweepy
+        _TW = tweepy.Client(
+            bearer_token=os.environ["TWITTER_BEARER"],
+            wait_on_rate_limit=False      # el 429 lo maneja search_tweets (pausa global)
+        )
+    return _TW
+
+def search_tweets(query: str, n: int = MAX_TWEETS, since_id: str | None = None,
+                  until_id: str | None = None):
+    """
+    (tweets, truncated): tweets entre `since_id` y `until_id`, paginando con
+    next_token hasta `n`. La API devuelve del más nuevo al más viejo;
+    truncated=True indica que quedaron más viejos sin leer (el tope acota el
+    costo por ejecución) y el watermark guarda el hueco para las siguientes.
+    """
+    import tweepy
+    limit = ENDPOINT_LIMITS["search_recent_tweets"]
+    tweets, token = [], None
+    while len(tweets) < n:
+        for attempt in range(RATE_RETRIES + 1):
+            limit.acquire()
+            try:
+                resp = twitter().search_recent_tweets(
+                    query=query,
+                    max_results=max(10, min(100, n - len(tweets))),
+                    since_id=since_id,
+                    until_id=until_id,
+                    next_token=token,
+                    tweet_fields=["id", "text", "created_at", "author_id"]
+                )
+                break
+            except tweepy.TooManyRequests as e:
+                if attempt == RATE_RETRIES:
+                    raise                       # la query falla y conserva su ventana
+                limit.backoff(reset_delay(e))   # pausa a todas las búsquedas en curso
+        tweets.extend(resp.data or [])
+        token = (resp.meta or {}).get("next_token")
+        if not token:
+            break
+    return tweets[:n], bool(token) or len(tweets) > n
+
+def fetch_query(job, marks):
+    """
+    job = (entidad, source, query) → (tweets, [(ventana, ids, truncated), …]).
+    Lo más nuevo usa todo el tope; lo que sobra drena los huecos pendientes.
+    """
+    _, _, q = job
+    tweets, fetched = [], []
+    for window in marks.windows(q):
+        left = MAX_TWEETS - len(tweets)
+        if left <= 0:
+            break
+        got, truncated = search_tweets(q, left, **window)
+        tweets += got
+        fetched.append((window, [tw.id for tw in got], truncated))
+    return tweets, fetched
+
+def put_parquet(table, key: str) -> int:
+    """Sube `table` a s3://BUCKET/key; devuelve el tamaño en bytes."""
+    from parquet_writer import to_parquet_bytes
+    body = to_parquet_bytes(table)
+    get_client("s3").put_object(Bucket=BUCKET, Key=key, Body=body,
+                                ContentType="application/vnd.apache.parquet")
+    return len(body)
+
+def put_success(run_id: str, written: dict) -> str:
+    """Marcador de fin de ejecución con las keys escritas; dispara el trigger S3 de gráficas."""
+    key = f"runs/{run_id}/_SUCCESS"
+    get_client("s3").put_object(Bucket=BUCKET, Key=key, Body=json.dumps(written).encode(),
+                                ContentType="application/json")
+    return key
+
+def batch_key(entity: str, hour: dt.datetime, now: dt.datetime) -> str:
+    """Partición por hora de *evento* (created_at); el nombre lleva la hora de ingesta."""
+    return (
+        f"tweets/entity={entity}/year={hour.year}/month={hour.month:02d}/"
+        f"day={hour.day:02d}/hour={hour.hour:02d}/"
+        f"batch_{now.strftime('%Y%m%dT%H%M%S')}_{uuid.uuid4().hex[:8]}.parquet"
+    )
 
 # ── Lambda handler ───────────────────────────────────────────────
 def lambda_handler(event, context):
-    # 1) Búsqueda principal
-    acct_q = " OR ".join([f"from:{a[1:]}" for a in FIN_ACCOUNTS])
-    q_news = f'"BBVA" ({acct_q}) -is:retweet lang:es'
-    tweets = search_tweets(q_news, 30)
-
-    # 2) Fallback si no hay resultados
-    if not tweets:
-        tweets = search_tweets('"BBVA" -is:retweet lang:es', 30)
+    cache = default_cache()                  # contadores acumulados en invocaciones warm
+    hits0, misses0 = cache.hits, cache.misses
+    # 1) Queries de todas las entidades en paralelo, bajo el límite por endpoint:
+    #    el tiempo lo marca la query más lenta de cada fase, no la suma
+    marks = default_store(BUCKET)
+    fetch = lambda job: fetch_query(job, marks)
+    jobs = [(ent, "news", ent.news_query) for ent in ENTITIES]
+    if GENERAL_QUERY_ALWAYS:
+        jobs += [(ent, "twitter", ent.fallback_query) for ent in ENTITIES]
+    results, fetch_errors = run_ordered(fetch, jobs, max_workers=FETCH_WORKERS)
+
+    # 1b) Query general sólo para las entidades sin noticias nuevas
+    if not GENERAL_QUERY_ALWAYS:
+        extra = [(ent, "twitter", ent.fallback_query)
+                 for ent, res in zip(ENTITIES, results) if not res or not res[0]]
+        more, more_errors = run_ordered(fetch, extra, max_workers=FETCH_WORKERS)
+        fetch_errors += [(len(jobs) + i, err) for i, err in more_errors]
+        jobs += extra
+        results += more
+
+    # 2) Une y deduplica por tweet_id; cada tweet recuerda qué entidades lo mencionan
+    by_id, found = {}, {}                       # id → tweet · id → {entidad: source}
+    for (ent, source, _), res in zip(jobs, results):
+        for tw in (res[0] if res else []):
+            by_id.setdefault(tw.id, tw)
+            sources = found.setdefault(tw.id, {})
+            if sources.get(ent.name) != "news":  # la cuenta de noticias manda
+                sources[ent.name] = source
+    folded = {tw_id: fold(tw.text) for tw_id, tw in by_id.items()}   # una vez por tweet
+    for ent in ENTITIES:                        # menciones que otra búsqueda trajo
+        others = [tw_id for tw_id in by_id if ent.name not in found[tw_id]]
+        for tw_id, hits in zip(others, ent.mention.match_batch([folded[i] for i in others],
+                                                               folded=True)):
+            if hits:
+                found[tw_id][ent.name] = "twitter"
+    def advance_marks():
+        for (_, _, q), res in zip(jobs, results):
+            if res is not None:                 # una query que falló conserva su ventana
+                marks.record(q, res[1])
+        marks.save()
+
+    if not by_id:
+        advance_marks()                         # cierra los huecos que se drenaron vacíos
+        return {"status": "NO_DATA", "fetch_errors": len(fetch_errors)}
+
+    # 2b) Descarta tweets ya escritos por ejecuciones anteriores (no cuestan Bedrock)
+    index = DedupIndex(BUCKET)
+    tweets = index.filter_new(by_id.values())
     if not tweets:
-        return {"status": "NO_DATA"}
+        advance_marks()
+        return {"status": "NO_NEW_DATA", "duplicates": len(by_id)}
+
+    # 3) Etiqueta por entidad y clasifica cada tweet único una vez (K por invocación)
+    entities = {e.name: e for e in ENTITIES}
+    flags = {tw.id: {} for tw in tweets}
+    for name, ent in entities.items():
+        ids = [tw.id for tw in tweets if name in found[tw.id]]
+        for tw_id, f in zip(ids, ent.flags_batch([folded[i] for i in ids])):
+            flags[tw_id][name] = f
+    to_classify = [tw for tw in tweets
+                   if any(not f.get("futbol") for f in flags[tw.id].values())]
+
+    # 3b) Reanuda desde el checkpoint de esta ejecución (reintento con el mismo run_id)
+    run_id = (event or {}).get("run_id") or getattr(context, "aws_request_id", None) or uuid.uuid4().hex
+    ckpt = Checkpoint(BUCKET, run_id)
+    pending = [tw for tw in to_classify if ckpt.get(tw.id) is None]
+    labels, classify_errors = classify_batch(
+        [tw.text for tw in pending],
+        on_labels=lambda got: ckpt.record({pending[j].id: label for j, label in got.items()}),
+    )
+    sentiment = {tw.id: ckpt.get(tw.id) for tw in to_classify}
+    sentiment.update({tw.id: label for tw, label in zip(pending, labels) if label})
+    error = {pending[j].id: err for j, err in classify_errors}
 
-    # 3) Procesamiento: etiqueta y clasifica
-    rows = []
+    rows = {}                                   # entidad → filas
     for tw in tweets:
-        futbol_flag = is_futbol_related(tw.text)
-        app_flag    = is_app_related(tw.text)
-        sentiment   = None if futbol_flag else bedrock_sentiment(tw.text)
-
-        rows.append({
-            "tweet_id"  : tw.id,
-            "author_id" : tw.author_id,
-            "created_at": tw.created_at,
-            "text"      : tw.text,
-            "sentiment" : sentiment,
-            "tickers"   : ["BBVA"],
-            "source"    : "news" if tw.text.startswith(tuple(FIN_ACCOUNTS)) else "twitter",
-            "is_futbol" : futbol_flag,
-            "is_app"    : app_flag
-        })
-
-    df = pd.DataFrame(rows)
-
-    # 4) Escribe Parquet con timestamp y UUID
+        tickers = sorted(entities[name].ticker for name in found[tw.id])
+        for name, source in found[tw.id].items():
+            f = flags[tw.id][name]
+            f_terms, a_terms = f.get("futbol", []), f.get("app", [])
+            rows.setdefault(name, []).append({
+                "tweet_id"  : tw.id,
+                "author_id" : tw.author_id,
+                "created_at": tw.created_at,
+                "text"      : tw.text,
+                "sentiment" : None if f_terms else sentiment.get(tw.id),
+                "error"     : None if f_terms else error.get(tw.id),
+                "tickers"   : tickers,
+                "source"    : source,
+                "is_futbol" : bool(f_terms),
+                "is_app"    : bool(a_terms),
+                "futbol_terms": f_terms,
+                "app_terms" : a_terms
+            })
+
+    # 4) Un Parquet (zstd, en memoria) por entidad y hora de created_at
+    from parquet_writer import to_table, split_by_hour   # pyarrow sólo si hay algo que escribir
     now = dt.datetime.utcnow()
-    ts = now.strftime("%Y%m%dT%H%M%S")
-    uid = uuid.uuid4().hex[:8]
-    key = (
-        f"tweets/year={now.year}/month={now.month:02d}/"
-        f"day={now.day:02d}/hour={now.hour:02d}/"
-        f"batch_{ts}_{uid}.parquet"
-    )
-
-    tmp = tempfile.NamedTemporaryFile(suffix=".parquet", delete=False)
-    pq.write_table(pa.Table.from_pandas(df), tmp.name)
-    boto3.client("s3").upload_file(tmp.name, BUCKET, key)
-
+    written = {}
+    for name, ent_rows in rows.items():
+        keys = []
+        for hour, hour_rows in split_by_hour(ent_rows).items():
+            key = batch_key(name, hour, now)
+            put_parquet(to_table(hour_rows), key)
+            keys.append(key)
+        written[name] = {"rows": len(ent_rows), "parquet_keys": keys}
+
+    # 5) Registra los ids escritos y avanza los watermarks sólo tras escribir
+    index.commit(tweets)
+    advance_marks()
+    ckpt.clear()
+    success_key = put_success(run_id, written)   # último: un solo evento para la Lambda de gráficas
+
+    all_rows = [r for ent_rows in rows.values() for r in ent_rows]
+    hits, misses = cache.hits - hits0, cache.misses - misses0
     return {
         "status": "OK",
-        "rows": int(len(df)),
-        "classified": int(df["sentiment"].notna().sum()),
-        "app_tweets": int(df["is_app"].sum()),
-        "futbol_tweets": int(df["is_futbol"].sum()),
-        "parquet_key": key
+        "cache_hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+        "unique_tweets": len(tweets),
+        "rows": len(all_rows),
+        "duplicates": len(by_id) - len(tweets),
+        "run_id": run_id,
+        "success_key": success_key,
+        "classified": sum(label is not None for label in sentiment.values()),
+        "resumed_from_checkpoint": len(to_classify) - len(pending),
+        "classify_errors": len(classify_errors),
+        "fetch_errors": [(jobs[i][0].name, jobs[i][1], err) for i, err in fetch_errors],
+        "app_tweets": sum(r["is_app"] for r in all_rows),
+        "futbol_tweets": sum(r["is_futbol"] for r in all_rows),
+        "entities": written
     }
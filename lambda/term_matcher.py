@@ -0,0 +1,56 @@
+"""
+Detección de términos por categoría (fútbol, app, …) con una sola regex
+compilada por categoría.
+
+• Insensible a mayúsculas y acentos: texto y términos se pliegan
+  (NFKD sin diacríticos), así «fútbol», «futbol» y «FUTBOL» coinciden.
+• Coincide por palabra completa: «gol» no dispara en «golpe» ni «club»
+  en «clubes».
+• Las listas salen de `terms.json` (o TERMS_PATH) y se pueden sobreescribir
+  por categoría con TERMS_<CATEGORIA>="a,b,c".
+"""
+import json
+import os
+import re
+import unicodedata
+from pathlib import Path
+
+TERMS_PATH = os.getenv("TERMS_PATH", str(Path(__file__).with_name("terms.json")))
+
+
+def fold(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+class TermMatcher:
+    def __init__(self, terms):
+        self.terms: dict[str, str] = {}                 # plegado → término original
+        for t in terms:
+            self.terms.setdefault(fold(t).strip(), t)
+        alts = sorted(self.terms, key=len, reverse=True)  # «liga mx» antes que «liga»
+        body = "|".join(re.escape(t).replace(r"\ ", r"\s+") for t in alts) or r"(?!)"
+        self.regex = re.compile(rf"(?<!\w)(?:{body})(?!\w)")
+
+    def match(self, text: str, folded: bool = False) -> list[str]:
+        """Términos (forma original, sin repetir) presentes en `text`."""
+        hits = dict.fromkeys(re.sub(r"\s+", " ", m)
+                             for m in self.regex.findall(text if folded else fold(text)))
+        return [self.terms[h] for h in hits if h in self.terms]
+
+    def match_batch(self, texts, folded: bool = False) -> list[list[str]]:
+        """
+        `match` para un lote. Con folded=True los textos ya vienen plegados:
+        el llamador pliega cada tweet una vez y lo pasa por todos los matchers.
+        """
+        return [self.match(t, folded) for t in texts]
+
+
+def load_matchers(path: str = TERMS_PATH) -> dict[str, TermMatcher]:
+    """{categoría: TermMatcher} a partir del JSON {categoría: [términos]}."""
+    config = json.loads(Path(path).read_text(encoding="utf-8"))
+    for cat in config:
+        env = os.getenv(f"TERMS_{cat.upper()}")
+        if env:
+            config[cat] = [t.strip() for t in env.split(",") if t.strip()]
+    return {cat: TermMatcher(terms) for cat, terms in config.items()}
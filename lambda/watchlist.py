@@ -0,0 +1,59 @@
+"""
+Watchlist de entidades que ingiere el Lambda en cada ejecución.
+
+`watchlist.json` (o WATCHLIST_PATH):
+    {"entities": [
+        {"name": "BBVA", "ticker": "BBVA", "terms": ["BBVA"],
+         "accounts": ["@Reuters", ...], "lang": "es",
+         "categories": {"futbol": [...], "app": [...]}}     ← opcional
+    ]}
+Las categorías que una entidad no define salen de `terms.json`.
+"""
+import json
+import os
+from pathlib import Path
+
+from term_matcher import TermMatcher, load_matchers
+
+WATCHLIST_PATH = os.getenv("WATCHLIST_PATH", str(Path(__file__).with_name("watchlist.json")))
+
+
+class Entity:
+    def __init__(self, name: str, ticker: str, terms, accounts=(), lang: str = "es",
+                 categories: dict | None = None, defaults: dict | None = None):
+        self.name = name
+        self.ticker = ticker
+        self.terms = list(terms)
+        self.accounts = list(accounts)
+        self.lang = lang
+        self.mention = TermMatcher(self.terms)          # ¿el texto nombra a la entidad?
+        self.matchers = dict(defaults or {})
+        for cat, cat_terms in (categories or {}).items():
+            self.matchers[cat] = TermMatcher(cat_terms)
+
+    def _terms_q(self) -> str:
+        q = " OR ".join(f'"{t}"' for t in self.terms)
+        return f"({q})" if len(self.terms) > 1 else q
+
+    @property
+    def news_query(self) -> str:
+        acct_q = " OR ".join(f"from:{a.lstrip('@')}" for a in self.accounts)
+        return f"{self._terms_q()} ({acct_q}) -is:retweet lang:{self.lang}"
+
+    @property
+    def fallback_query(self) -> str:
+        return f"{self._terms_q()} -is:retweet lang:{self.lang}"
+
+    def flags(self, text: str) -> dict[str, list[str]]:
+        return {cat: m.match(text) for cat, m in self.matchers.items()}
+
+    def flags_batch(self, folded_texts) -> list[dict[str, list[str]]]:
+        """`flags` de un lote de textos ya plegados (`term_matcher.fold`)."""
+        by_cat = {cat: m.match_batch(folded_texts, folded=True) for cat, m in self.matchers.items()}
+        return [{cat: hits[j] for cat, hits in by_cat.items()} for j in range(len(folded_texts))]
+
+
+def load_watchlist(path: str = WATCHLIST_PATH) -> list[Entity]:
+    config = json.loads(Path(path).read_text(encoding="utf-8"))
+    defaults = load_matchers()
+    return [Entity(defaults=defaults, **e) for e in config["entities"]]
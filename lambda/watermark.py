@@ -0,0 +1,148 @@
+"""
+Watermark persistente de ingesta por query.
+
+Estado por query (JSON en S3, `s3://BUCKET/WATERMARK_KEY`, o en un archivo
+local si WATERMARK_PATH está definido — pruebas / stand-in):
+    {"since_id": "…", "gaps": [["lo", "hi"], …]}
+
+`since_id` es el tweet más nuevo ya traído; cada hueco (lo, hi) son ids
+entre lo y hi (exclusivos) que quedaron sin leer porque una búsqueda llegó al
+tope con más páginas pendientes (lo=None: hasta el inicio de la ventana de 7
+días de search_recent).
+
+Cada ejecución busca primero lo más nuevo (después de `since_id`) con todo el
+tope, y lo que sobre del tope drena los huecos, del más nuevo al más viejo.
+Así la frescura no se detiene mientras haya atraso. Un hueco se cierra cuando
+su búsqueda no llega al tope (incluida la que no trae nada).
+
+search_recent sólo acepta ids de los últimos 7 días: un `since_id` o un `lo`
+más viejo (query con poco tráfico) se omite, y un hueco cuyo `hi` ya salió de
+la ventana se descarta (esos tweets ya no se pueden pedir).
+
+`save()` en S3 es un PUT condicional (If-Match / If-None-Match): si otra
+ejecución escribió entre medio se relee y se une query por query quedándose
+con el estado más avanzado, de modo que un watermark nunca retrocede.
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+from botocore.exceptions import ClientError
+
+from aws_clients import get_client
+
+WATERMARK_KEY = os.getenv("WATERMARK_KEY", "state/watermarks.json")
+
+TWEPOCH_MS = 1288834974657                       # época de los snowflake ids de X
+SEARCH_WINDOW_S = 7 * 24 * 3600 - 600            # 7 días, con margen
+
+
+def floor_id(now: float | None = None) -> int:
+    """Id snowflake del inicio de la ventana de search_recent."""
+    ms = int(((now if now is not None else time.time()) - SEARCH_WINDOW_S) * 1000)
+    return (ms - TWEPOCH_MS) << 22
+
+
+def _upgrade(v) -> dict:
+    """Formatos anteriores: {query: newest_id} y {since_id, until_id, high}."""
+    if not isinstance(v, dict):
+        return {"since_id": v, "gaps": []}
+    if "until_id" in v:
+        return {"since_id": v["high"], "gaps": [[v["since_id"], v["until_id"]]]}
+    return {"since_id": v.get("since_id"), "gaps": [list(g) for g in v.get("gaps", [])]}
+
+
+def _progress(state: dict | None) -> tuple:
+    """Orden de avance: since_id mayor; a igual since_id, menos ids pendientes."""
+    if not state:
+        return (-1, 0)
+    pending = sum(int(hi) - int(lo or 0) for lo, hi in state.get("gaps", []))
+    return (int(state.get("since_id") or -1), -pending)
+
+
+class WatermarkStore:
+    def __init__(self, bucket: str | None = None, key: str = WATERMARK_KEY,
+                 path: str | None = None, max_retries: int = 5):
+        self.bucket = bucket
+        self.key = key
+        self.path = Path(path) if path else None
+        self.max_retries = max_retries
+        self._data, self._etag = self._load()
+        self._changed: set[str] = set()
+
+    def _load(self) -> tuple[dict, str | None]:
+        if self.path is not None:
+            data = json.loads(self.path.read_text()) if self.path.exists() else {}
+            return {q: _upgrade(v) for q, v in data.items()}, None
+        s3 = get_client("s3")
+        try:
+            obj = s3.get_object(Bucket=self.bucket, Key=self.key)
+        except s3.exceptions.NoSuchKey:
+            return {}, None
+        return {q: _upgrade(v) for q, v in json.loads(obj["Body"].read()).items()}, obj["ETag"]
+
+    def windows(self, query: str, now: float | None = None) -> list[dict]:
+        """
+        kwargs since_id / until_id de cada búsqueda pendiente de `query`, en
+        orden: lo más nuevo primero, luego los huecos del más nuevo al más viejo.
+        """
+        st, floor = self._data.get(query, {}), floor_id(now)
+        fresh = lambda i: i if i is not None and int(i) > floor else None
+        out = [{"since_id": fresh(st.get("since_id")), "until_id": None}]
+        out += [{"since_id": fresh(lo), "until_id": hi}
+                for lo, hi in st.get("gaps", []) if int(hi) > floor]
+        return out
+
+    def record(self, query: str, fetched, now: float | None = None) -> None:
+        """
+        Actualiza el estado con [(ventana, ids, truncated), …] de las ventanas
+        de `windows(query)` que se buscaron; truncated=True → quedaron páginas
+        sin leer por el tope. Las ventanas no buscadas conservan su hueco.
+        """
+        st, floor = self._data.get(query, {}), floor_id(now)
+        since = st.get("since_id")
+        gaps = [g for g in st.get("gaps", []) if int(g[1]) > floor]
+        new_gaps = []
+        for w, ids, truncated in fetched:
+            ids = [int(i) for i in ids]
+            if w["until_id"] is not None:                # drenando un hueco
+                gaps = [g for g in gaps if g[1] != w["until_id"]]
+            elif ids and (since is None or max(ids) > int(since)):
+                since = str(max(ids))
+            if truncated and ids:                        # queda sin leer (lo, más viejo traído)
+                new_gaps.append([w["since_id"], str(min(ids))])
+        st = {"since_id": since, "gaps": sorted(new_gaps + gaps, key=lambda g: -int(g[1]))}
+        if st != self._data.get(query):
+            self._data[query] = st
+            self._changed.add(query)
+
+    def save(self) -> None:
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(self._data, sort_keys=True))
+            return
+        s3 = get_client("s3")
+        mine = {q: self._data[q] for q in self._changed}
+        for _ in range(self.max_retries):
+            cond = {"IfMatch": self._etag} if self._etag else {"IfNoneMatch": "*"}
+            try:
+                resp = s3.put_object(Bucket=self.bucket, Key=self.key,
+                                     Body=json.dumps(self._data, sort_keys=True).encode(),
+                                     ContentType="application/json", **cond)
+            except ClientError as e:
+                if e.response["Error"]["Code"] not in ("PreconditionFailed", "ConditionalRequestConflict"):
+                    raise
+                self._data, self._etag = self._load()   # otra ejecución escribió: relee y une
+                for q, st in mine.items():
+                    if _progress(st) > _progress(self._data.get(q)):
+                        self._data[q] = st
+                continue
+            self._etag = resp["ETag"]
+            self._changed.clear()
+            return
+        raise RuntimeError(f"No se pudo actualizar s3://{self.bucket}/{self.key}")
+
+
+def default_store(bucket: str) -> WatermarkStore:
+    return WatermarkStore(bucket, path=os.getenv("WATERMARK_PATH"))
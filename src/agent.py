@@ -1,17 +1,112 @@
+import json
+import os
+from pathlib import Path
+
 import pandas as pd
 import streamlit as st
 
 from src.vector_db import VectorDB
 from src.data_pipeline import add_labels
-from src.bedrock_client import claude_chat
+from src.bedrock_client import claude_chat, claude_chat_stream
+from src.snapshot import MANIFEST, export_snapshot, restore_snapshot
+from src.context_builder import build_context
+
+DB_PATH = os.getenv("VECTOR_DB_PATH", "chroma_db")
+CORPUS_FILE = "corpus.parquet"                # DataFrame del agente dentro de DB_PATH
+
+
+def _env_int(name: str) -> int | None:
+    val = os.getenv(name)
+    return int(val) if val else None
 
 
 class FinancialTweetAgent:
     """Administra corpus, vector DB y consultas RAG."""
 
-    def __init__(self):
-        self.db = VectorDB()
+    def __init__(self, snapshot_uri: str | None = None):
         self.df = pd.DataFrame()
+        self.ingested_keys: set[str] = set()
+        self._meta: dict[str, dict] = {}                           # doc_id → created_at/sentiment
+        snapshot_uri = snapshot_uri or os.getenv("SNAPSHOT_URI")
+        if snapshot_uri and not any(Path(DB_PATH).glob("*")):
+            self._restore(snapshot_uri)
+        self._load_local()          # restaurado ahora o en un arranque anterior (volumen)
+
+        self.db = VectorDB(
+            path=DB_PATH,
+            quantized=os.getenv("VECTOR_INT8") == "1",
+            hnsw_m=_env_int("HNSW_M"),
+            ef_construction=_env_int("HNSW_EF_CONSTRUCTION"),
+            ef_search=_env_int("HNSW_EF_SEARCH"),
+            partition=os.getenv("VECTOR_PARTITION") or None,      # "month" | "day"
+        )
+        self.retention = _env_int("VECTOR_RETENTION")             # nº de particiones a conservar
+        dedup = os.getenv("DEDUP_THRESHOLD")                       # p. ej. 0.95
+        self.dedup_threshold = float(dedup) if dedup else None
+        self.dedup_mode = os.getenv("DEDUP_MODE", "skip")          # "skip" | "link"
+        ttl = os.getenv("RAG_CACHE_TTL")                           # segundos; vacío = sin caché
+        self.rag_cache_ttl = float(ttl) if ttl else None
+        self.context_budget = _env_int("CONTEXT_TOKEN_BUDGET") or 1500
+        if not self.df.empty:
+            self._index_meta(self.df)
+            # Re-sincroniza vectores que no alcanzaron a persistirse antes del
+            # snapshot; los ya indexados se descartan sin re-embeber y las filas
+            # de particiones fuera de VECTOR_RETENTION no se re-crean.
+            self._add_to_db(self.df)
+
+    # ─── Snapshots (arranque en caliente) ────────────────────────
+    def _restore(self, uri: str):
+        try:
+            manifest = restore_snapshot(uri, DB_PATH)
+        except (ValueError, FileNotFoundError) as e:     # checksum inválido / tar ausente
+            st.warning(f"Snapshot descartado ({e}); se reconstruye el índice.")
+
+    def _load_local(self):
+        """Corpus + keys ingeridas del último snapshot restaurado o publicado en DB_PATH."""
+        corpus, manifest = Path(DB_PATH) / CORPUS_FILE, Path(DB_PATH) / MANIFEST
+        if corpus.exists() and manifest.exists():
+            self.df = pd.read_parquet(corpus)
+            self.ingested_keys = set(json.loads(manifest.read_text()).get("ingested_keys", []))
+
+    def save_snapshot(self, uri: str | None = None) -> dict:
+        """Publica índice + corpus + keys ingeridas en `uri` (dir local o s3://…)."""
+        uri = uri or os.getenv("SNAPSHOT_URI")
+        self.df.to_parquet(Path(DB_PATH) / CORPUS_FILE)
+        self.db.close()                 # no empaquetar un Chroma abierto a medio escribir
+        try:
+            return export_snapshot(DB_PATH, uri, self.ingested_keys, n_docs=len(self.df))
+        finally:
+            self.db.reopen()
+
+    def _add_to_db(self, df: pd.DataFrame):
+        ts = df["created_at"].tolist() if "created_at" in df else None
+        self.db.add(df["doc_id"].tolist(), df["clean"].tolist(), timestamps=ts,
+                    dedup_threshold=self.dedup_threshold, dedup_mode=self.dedup_mode,
+                    retention=self.retention)
+        if self.retention:
+            self.db.apply_retention(self.retention)
+
+    def _index_meta(self, df: pd.DataFrame):
+        """Agrega al lookup del contexto RAG sólo las filas nuevas (se conserva la primera)."""
+        if df.empty or "doc_id" not in df:
+            return
+        cols = [c for c in ("created_at", "sentiment") if c in df]
+        for doc_id, row in df.drop_duplicates("doc_id").set_index("doc_id")[cols].to_dict("index").items():
+            self._meta.setdefault(doc_id, row)
+
+    def _relabel(self, df: pd.DataFrame):
+        """Sentimiento de filas ya indexadas que llegan re-escritas por batch_backfill join."""
+        if df.empty or "sentiment" not in df or "sentiment" not in self.df:
+            return
+        labels = df.dropna(subset=["sentiment"]).set_index("doc_id")["sentiment"]
+        if labels.empty:
+            return
+        self.df["sentiment"] = self.df["sentiment"].astype(object)
+        hit = self.df["doc_id"].isin(labels.index)
+        self.df.loc[hit, "sentiment"] = self.df.loc[hit, "doc_id"].map(labels)
+        for doc_id, label in labels.items():
+            if doc_id in self._meta:
+                self._meta[doc_id]["sentiment"] = label
 
     # ─── Ingesta local ────────────────────────────────────────────
     def ingest(self, parquet_file):
@@ -20,12 +115,13 @@ class FinancialTweetAgent:
             df = add_labels(df, skip_if_present=True)
         if "doc_id" not in df:
             df["doc_id"] = df.index.astype(str)
-        self.db.add(df["doc_id"].tolist(), df["clean"].tolist())
+        self._add_to_db(df)
+        self._index_meta(df)
         self.df = pd.concat([self.df, df], ignore_index=True)
 
     # ─── Ingesta desde S3 (NUEVO) ────────────────────────────────
     def ingest_s3_prefix(self, bucket: str, prefix: str = "tweets/"):
-        import s3fs, pyarrow.parquet as pq, pyarrow as pa
+        import s3fs, pyarrow.parquet as pq
 
         fs = s3fs.S3FileSystem()
         files = fs.glob(f"{bucket}/{prefix}**/*.parquet")
@@ -33,14 +129,28 @@ class FinancialTweetAgent:
             st.warning("No se encontraron Parquets en S3.")
             return pd.DataFrame()
 
-        tables = [pq.read_table(fs.open(f)) for f in files]
-        df = pa.concat_tables(tables).to_pandas()
+        # Sólo los Parquet que no estaban en el snapshot / sincronización previa
+        files = [f for f in files if f not in self.ingested_keys]
+        if not files:
+            return pd.DataFrame()
+        # pandas une lotes viejos (strings, ns) y nuevos (dictionary, µs) sin conflictos de tipo
+        df = pd.concat([pq.read_table(fs.open(f)).to_pandas() for f in files], ignore_index=True)
+        if "sentiment" in df:
+            df["sentiment"] = df["sentiment"].astype(object)
+        if "clean" not in df:
+            df = add_labels(df, skip_if_present=True)
         if "doc_id" not in df:
-            df["doc_id"] = df.index.astype(str)
-        new = df[~df["doc_id"].isin(self.df.get("doc_id", []))]
+            df["doc_id"] = df["tweet_id"].astype(str) if "tweet_id" in df else df.index.astype(str)
+        # un tweet de varias entidades aparece en cada partición entity= (mismos tickers)
+        df = df.drop_duplicates("doc_id")
+        known = df["doc_id"].isin(self.df.get("doc_id", []))
+        self._relabel(df[known])
+        new = df[~known]
         if not new.empty:
-            self.db.add(new["doc_id"].tolist(), new["clean"].tolist())
+            self._add_to_db(new)
+            self._index_meta(new)
             self.df = pd.concat([self.df, new], ignore_index=True)
+        self.ingested_keys.update(files)
         return new
 
     # ─── Pivot de sentimiento por ticker ─────────────────────────
@@ -64,8 +174,25 @@ class FinancialTweetAgent:
         return piv
 
     # ─── RAG histórico ───────────────────────────────────────────
-    def insight_hist(self, query: str, k: int = 30):
-        docs = self.db.query(query, k)
-        context = "\n".join(docs)
-        prompt = f"Contexto:\n{context}\n\nPregunta: {query}"
-        return claude_chat(prompt)
+    def _rag_prompt(self, query: str, k: int, start, end, mmr_lambda,
+                    stats: dict | None = None) -> str:
+        # MMR: los k documentos del contexto no repiten el mismo titular sindicado
+        hits = self.db.query(query, k, start=start, end=end, mmr_lambda=mmr_lambda,
+                             with_ids=True)
+        context, ctx_stats = build_context(
+            [(doc, self._meta.get(doc_id, {})) for doc_id, doc in hits], budget=self.context_budget
+        )
+        if stats is not None:
+            stats["context"] = ctx_stats
+        return f"Contexto:\n{context}\n\nPregunta: {query}"
+
+    def insight_hist(self, query: str, k: int = 30, start=None, end=None,
+                     mmr_lambda: float | None = 0.5):
+        prompt = self._rag_prompt(query, k, start, end, mmr_lambda)
+        return claude_chat(prompt, cache_ttl=self.rag_cache_ttl)
+
+    def insight_hist_stream(self, query: str, k: int = 30, start=None, end=None,
+                            mmr_lambda: float | None = 0.5, stats: dict | None = None):
+        """Recupera el contexto ya y devuelve un generador de deltas de Claude."""
+        prompt = self._rag_prompt(query, k, start, end, mmr_lambda, stats)
+        return claude_chat_stream(prompt, stats=stats, cache_ttl=self.rag_cache_ttl)
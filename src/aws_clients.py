@@ -0,0 +1,54 @@
+"""
+Fábrica compartida de clientes boto3.
+
+Los clientes se construyen la primera vez que se piden (no al importar) y se
+reutilizan en todo el proceso: un único pool de conexiones por servicio/región,
+con timeouts, reintentos adaptativos y TCP keepalive.
+
+Variables de entorno:
+  AWS_MAX_POOL_CONNECTIONS (50) · AWS_CONNECT_TIMEOUT (3 s)
+  AWS_READ_TIMEOUT (60 s)       · AWS_MAX_ATTEMPTS (5)
+  AWS_ENDPOINT_URL_<SERVICIO>  → endpoint alternativo, p. ej.
+  AWS_ENDPOINT_URL_BEDROCK_RUNTIME=http://127.0.0.1:8787 (tools/bedrock_stub.py)
+"""
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+_clients: dict[tuple[str, str, int | None], object] = {}
+_lock = threading.Lock()
+
+
+def client_config(max_attempts: int | None = None) -> Config:
+    return Config(
+        max_pool_connections=int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "50")),
+        connect_timeout=float(os.getenv("AWS_CONNECT_TIMEOUT", "3")),
+        read_timeout=float(os.getenv("AWS_READ_TIMEOUT", "60")),
+        # total_max_attempts cuenta el intento inicial (max_attempts son sólo reintentos).
+        # Con max_attempts explícito el llamador controla reintentos y ritmo: modo
+        # "standard", sin el limitador client-side de "adaptive" encima del suyo.
+        retries={"mode": "standard" if max_attempts else "adaptive",
+                 "total_max_attempts": max_attempts or int(os.getenv("AWS_MAX_ATTEMPTS", "5"))},
+        tcp_keepalive=True,
+    )
+
+
+def get_client(service: str, region: str | None = None, max_attempts: int | None = None):
+    """
+    Cliente boto3 compartido (thread-safe) para `service` en `region`.
+    max_attempts=1 → sin reintentos de botocore, para llamadores que ya
+    reintentan por su cuenta (una sola capa dueña de los reintentos).
+    """
+    region = region or os.getenv("AWS_REGION", "us-east-1")
+    key = (service, region, max_attempts)
+    if key not in _clients:
+        with _lock:                                   # boto3.Session no es thread-safe
+            if key not in _clients:
+                endpoint = os.getenv("AWS_ENDPOINT_URL_" + service.upper().replace("-", "_"))
+                _clients[key] = boto3.session.Session().client(
+                    service, region_name=region, config=client_config(max_attempts),
+                    endpoint_url=endpoint,
+                )
+    return _clients[key]
@@ -1,23 +1,112 @@
-import boto3, json, os
-br = boto3.client("bedrock-runtime", region_name=os.getenv("AWS_REGION","us-east-1"))
-
-def claude_chat(prompt, max_tokens=400, temp=0.3):
-    body = {
-      "anthropic_version": "bedrock-2023-05-31",
-      "messages":[{"role":"user","content":prompt}],
-      "max_tokens": max_tokens, "temperature": temp
-    }
-    out = br.invoke_model(
-      modelId="anthropic.claude-3-sonnet-20240229-v1:0",
+import json, time
+from src import metrics
+from src.aws_clients import get_client
+from src.response_cache import default_cache, is_cacheable
+from src.model_routing import anthropic_body, route
+
+def _claude_request(task, prompt, max_tokens, temp):
+    """(model_id, body) según la ruta de `task`; max_tokens/temp explícitos mandan."""
+    cfg = route(task)
+    body = anthropic_body(prompt,
+                          cfg["max_tokens"] if max_tokens is None else max_tokens,
+                          cfg["temperature"] if temp is None else temp)
+    return cfg["model_id"], body
+
+def _runtime():
+    return metrics.instrument(get_client("bedrock-runtime"))
+
+def _usage(result):
+    """(input, output) tokens de una respuesta Claude o Titan."""
+    if "usage" in result:
+        return result["usage"].get("input_tokens"), result["usage"].get("output_tokens")
+    return result.get("inputTextTokenCount"), 0
+
+def invoke_json(model_id, body, cache_ttl=None):
+    """
+    invoke_model con caché en disco (sólo temperature 0 o `cache_ttl` explícito)
+    y métricas de latencia, tokens, reintentos y throttles por invocación.
+    """
+    t0 = time.perf_counter()
+    cacheable = is_cacheable(body, cache_ttl)
+    if cacheable:
+        hit = default_cache().get(model_id, body)
+        if hit is not None:
+            metrics.record_invocation(model_id, time.perf_counter() - t0, cache_hit=True)
+            return hit
+    metrics.take_throttles()
+    try:
+        out = _runtime().invoke_model(
+          modelId=model_id,
+          body=json.dumps(body),
+          contentType="application/json",
+          accept="application/json")
+    except Exception:
+        metrics.record_invocation(model_id, time.perf_counter() - t0,
+                                  throttles=metrics.take_throttles())
+        raise
+    result = json.loads(out["body"].read())
+    metrics.record_invocation(model_id, time.perf_counter() - t0, *_usage(result),
+                              retries=out["ResponseMetadata"].get("RetryAttempts", 0),
+                              throttles=metrics.take_throttles())
+    if cacheable:
+        default_cache().put(model_id, body, result, ttl=cache_ttl)
+    return result
+
+def claude_chat(prompt, max_tokens=None, temp=None, cache_ttl=None, task="chat"):
+    model_id, body = _claude_request(task, prompt, max_tokens, temp)
+    return invoke_json(model_id, body, cache_ttl)["content"][0]["text"]
+
+def claude_chat_stream(prompt, max_tokens=None, temp=None, stats=None, cache_ttl=None,
+                       task="chat", use_cache=True):
+    """
+    Igual que `claude_chat` pero genera los deltas de texto conforme llegan.
+    Si se pasa `stats` (dict) se rellena con ttft_s, total_s y tokens de uso.
+    Un acierto de caché se emite como un único delta; use_cache=False siempre
+    invoca el modelo (benchmarks que necesitan tokens y latencia reales).
+    """
+    t0 = time.perf_counter()
+    model_id, body = _claude_request(task, prompt, max_tokens, temp)
+    cacheable = use_cache and is_cacheable(body, cache_ttl)
+    hit = default_cache().get(model_id, body) if cacheable else None
+    if hit is not None:
+        metrics.record_invocation(model_id, time.perf_counter() - t0, cache_hit=True)
+        if stats is not None:
+            stats["ttft_s"] = stats["total_s"] = time.perf_counter() - t0
+            stats["cache_hit"] = True
+        yield hit["content"][0]["text"]
+        return
+
+    metrics.take_throttles()
+    out = _runtime().invoke_model_with_response_stream(
+      modelId=model_id,
       body=json.dumps(body),
       contentType="application/json",
       accept="application/json")
-    return json.loads(out["body"].read())["content"][0]["text"]
+    parts, usage = [], {}
+    for event in out["body"]:
+        chunk = json.loads(event["chunk"]["bytes"])
+        if chunk["type"] == "content_block_delta" and chunk["delta"].get("text"):
+            if stats is not None and "ttft_s" not in stats:
+                stats["ttft_s"] = time.perf_counter() - t0
+            parts.append(chunk["delta"]["text"])
+            yield chunk["delta"]["text"]
+        elif chunk["type"] == "message_stop":
+            usage = chunk.get("amazon-bedrock-invocationMetrics", {})
+    total_s = time.perf_counter() - t0
+    metrics.record_invocation(model_id, total_s, usage.get("inputTokenCount"),
+                              usage.get("outputTokenCount"),
+                              retries=out["ResponseMetadata"].get("RetryAttempts", 0),
+                              throttles=metrics.take_throttles())
+    if stats is not None:
+        stats["total_s"] = total_s
+        stats["input_tokens"] = usage.get("inputTokenCount")
+        stats["output_tokens"] = usage.get("outputTokenCount")
+    if cacheable:
+        # misma forma que la respuesta de invoke_model para compartir entradas
+        default_cache().put(model_id, body, {"content": [{"type": "text", "text": "".join(parts)}]},
+                            ttl=cache_ttl)
 
 def titan_embed(texts):
-    out = br.invoke_model(
-      modelId="amazon.titan-embed-text-multilingual-v1:0",
-      body=json.dumps({"inputText": texts}),
-      contentType="application/json",
-      accept="application/json")
-    return [json.loads(out["body"].read())["embedding"]]
+    # Titan embebe un texto por invocación
+    model_id = route("embed")["model_id"]
+    return [invoke_json(model_id, {"inputText": text})["embedding"] for text in texts]
@@ -0,0 +1,68 @@
+"""
+Circuit breaker para dependencias remotas (Titan Embed).
+
+closed    → las llamadas pasan; `failure_threshold` fallos seguidos lo abren.
+open      → se rechazan sin intentar durante `cooldown_s`.
+half_open → pasada la espera se deja pasar una sola sonda: éxito cierra,
+            fallo vuelve a abrir.
+
+El estado se publica como gauge `circuit.<nombre>` (0 closed, 1 half_open, 2 open).
+"""
+import threading
+import time
+
+from src import metrics
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 3, cooldown_s: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self.failures = 0
+        self.opened_at = 0.0
+        self._state = CLOSED
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self._publish()
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def _set(self, state: str):
+        self._state = state
+        self._publish()
+
+    def _publish(self):
+        metrics.set_gauge(f"circuit.{self.name}", _GAUGE[self._state])
+
+    def allow(self) -> bool:
+        """¿Se puede intentar la llamada remota ahora?"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self.opened_at >= self.cooldown_s:
+                self._set(HALF_OPEN)
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probe_in_flight = False
+            if self._state != CLOSED:
+                self._set(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self._state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set(OPEN)
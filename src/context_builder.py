@@ -0,0 +1,74 @@
+"""
+Construcción del contexto RAG con presupuesto de tokens.
+
+Limpia cada snippet (URLs, RT/via, firmas de agencia), elimina duplicados,
+lo etiqueta con metadatos compactos y empaqueta en orden de ranking hasta
+agotar el presupuesto.
+"""
+import html
+import math
+import re
+
+_URL = re.compile(r"https?://\S+|www\.\S+")
+_RT = re.compile(r"^RT @\w+:\s*")
+_VIA = re.compile(r"\s*(?:via|vía)\s+@\w+\s*$", re.IGNORECASE)
+_AGENCY = re.compile(r"^\(?(?:Reuters|Bloomberg|AP|EFE|Europa Press)\)?\s*[-–—:]\s*", re.IGNORECASE)
+_TRAIL = re.compile(r"\s*(?:\|\s*[\w .]+|(?:Read|Leer) (?:more|más)\W*)$", re.IGNORECASE)
+_WS = re.compile(r"\s+")
+
+SENTIMENT_TAG = {"positive": "pos", "neutral": "neu", "negative": "neg"}
+
+
+def approx_tokens(text: str) -> int:
+    """Aproximación ~4 caracteres por token (suficiente para presupuestar)."""
+    return max(1, math.ceil(len(text) / 4))
+
+
+def strip_boilerplate(text: str) -> str:
+    text = html.unescape(text)
+    text = _URL.sub("", text)
+    text = _RT.sub("", text)
+    text = _VIA.sub("", text)
+    text = _AGENCY.sub("", text)
+    text = _TRAIL.sub("", text)
+    return _WS.sub(" ", text).strip()
+
+
+def _fingerprint(text: str) -> str:
+    return re.sub(r"\W+", "", text.lower())
+
+
+def _tag(meta: dict) -> str:
+    parts = []
+    ts = meta.get("created_at")
+    if ts is not None and str(ts) not in ("NaT", "None", "nan"):
+        parts.append(str(ts)[:10])
+    sent = SENTIMENT_TAG.get(meta.get("sentiment"))
+    if sent:
+        parts.append(sent)
+    return f"[{' · '.join(parts)}] " if parts else ""
+
+
+def build_context(snippets, budget: int = 1500) -> tuple[str, dict]:
+    """
+    snippets: [(texto, metadatos)] ordenados por relevancia.
+    Devuelve (contexto, stats) con stats = {snippets, tokens, dropped, raw_tokens}.
+    """
+    lines, seen, used, dropped, raw = [], set(), 0, 0, 0
+    for text, meta in snippets:
+        raw += approx_tokens(text)
+        clean = strip_boilerplate(text)
+        fp = _fingerprint(clean)
+        if not fp or fp in seen:
+            dropped += 1
+            continue
+        line = _tag(meta or {}) + clean
+        cost = approx_tokens(line) + 1                 # +1 por el salto de línea
+        if used + cost > budget:
+            dropped += 1
+            continue
+        seen.add(fp)
+        lines.append(line)
+        used += cost
+    return "\n".join(lines), {"snippets": len(lines), "tokens": used,
+                              "dropped": dropped, "raw_tokens": raw}
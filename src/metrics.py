@@ -0,0 +1,138 @@
+"""
+Métricas por invocación de modelo: latencia, tokens, reintentos, throttles
+y aciertos de caché.
+
+• En memoria: contadores e histogramas por model_id (`snapshot()` alimenta
+  el panel de diagnóstico de Streamlit).
+• CloudWatch: con METRICS_EMF=1 cada invocación y cada cambio de gauge se
+  imprimen como una línea Embedded Metric Format (en Lambda basta con stdout).
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+NAMESPACE = os.getenv("METRICS_NAMESPACE", "FinTweetAgent")
+
+_lock = threading.Lock()
+_local = threading.local()
+_counters: dict[str, dict[str, float]] = defaultdict(lambda: defaultdict(float))
+_latency: dict[str, deque] = defaultdict(lambda: deque(maxlen=10_000))
+_gauges: dict[str, float] = {}
+
+
+# ── Throttles vistos por botocore ─────────────────────────────────
+def _on_needs_retry(response=None, **kwargs):
+    if response and response[1].get("Error", {}).get("Code") == "ThrottlingException":
+        _local.throttles = getattr(_local, "throttles", 0) + 1
+
+
+def instrument(client):
+    """Cuenta los ThrottlingException que botocore reintenta (idempotente)."""
+    client.meta.events.register("needs-retry", _on_needs_retry, unique_id="metrics-throttles")
+    return client
+
+
+def take_throttles() -> int:
+    """Throttles acumulados en este hilo desde la última llamada."""
+    n = getattr(_local, "throttles", 0)
+    _local.throttles = 0
+    return n
+
+
+# ── Registro ──────────────────────────────────────────────────────
+def record_invocation(model_id: str, latency_s: float, input_tokens: int | None = 0,
+                      output_tokens: int | None = 0, retries: int = 0, throttles: int = 0,
+                      cache_hit: bool = False):
+    with _lock:
+        c = _counters[model_id]
+        c["calls"] += int(not cache_hit)   # un acierto no llega al modelo
+        c["input_tokens"] += input_tokens or 0
+        c["output_tokens"] += output_tokens or 0
+        c["retries"] += retries
+        c["throttles"] += throttles
+        c["cache_hits"] += int(cache_hit)
+        if not cache_hit:                  # p50/p99 son latencias del modelo
+            _latency[model_id].append(latency_s)
+    if os.getenv("METRICS_EMF") == "1":
+        print(json.dumps(emf_record(model_id, latency_s, input_tokens, output_tokens,
+                                    retries, throttles, cache_hit)))
+
+
+def set_gauge(name: str, value: float):
+    """Último valor de `name` (p. ej. estado de un circuit breaker); EMF si METRICS_EMF=1."""
+    with _lock:
+        _gauges[name] = value
+    if os.getenv("METRICS_EMF") == "1":
+        print(json.dumps(emf_gauge(name, value)))
+
+
+def emf_gauge(name: str, value: float) -> dict:
+    return {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": NAMESPACE,
+                "Dimensions": [["Gauge"]],
+                "Metrics": [{"Name": "Value", "Unit": "None"}],
+            }],
+        },
+        "Gauge": name,
+        "Value": value,
+    }
+
+
+def emf_record(model_id, latency_s, input_tokens, output_tokens, retries, throttles,
+               cache_hit) -> dict:
+    metrics = [("Calls", "Count"), ("InputTokens", "Count"), ("OutputTokens", "Count"),
+               ("Retries", "Count"), ("Throttles", "Count"), ("CacheHits", "Count")]
+    if not cache_hit:                    # la latencia de un acierto no es del modelo
+        metrics.append(("Latency", "Milliseconds"))
+    record = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": NAMESPACE,
+                "Dimensions": [["ModelId"]],
+                "Metrics": [{"Name": n, "Unit": u} for n, u in metrics],
+            }],
+        },
+        "ModelId": model_id,
+        "Calls": int(not cache_hit),
+        "InputTokens": input_tokens or 0,
+        "OutputTokens": output_tokens or 0,
+        "Retries": retries,
+        "Throttles": throttles,
+        "CacheHits": int(cache_hit),
+    }
+    if not cache_hit:
+        record["Latency"] = round(latency_s * 1000, 1)
+    return record
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def snapshot() -> list[dict]:
+    """Una fila por model_id con contadores y percentiles de latencia (ms)."""
+    rows = []
+    with _lock:
+        for model_id, c in _counters.items():
+            lat = [x * 1000 for x in _latency[model_id]]
+            rows.append({
+                "model_id": model_id,
+                **{k: int(v) for k, v in c.items()},
+                "p50_ms": _percentile(lat, 50),
+                "p99_ms": _percentile(lat, 99),
+            })
+    return rows
+
+
+def gauges() -> dict:
+    with _lock:
+        return dict(_gauges)
@@ -0,0 +1,49 @@
+"""
+Tabla de ruteo tarea → modelo de Bedrock + parámetros por tarea.
+
+Sobrescribible sin redeploy:
+  MODEL_ROUTES='{"classify": {"model_id": "anthropic.claude-3-haiku-20240307-v1:0"}}'
+  MODEL_ID_CLASSIFY=anthropic.claude-3-haiku-20240307-v1:0   (sólo el modelo)
+
+Elegir candidatos con `python -m tools.compare_classifiers`.
+"""
+import json
+import os
+
+SONNET = "anthropic.claude-3-sonnet-20240229-v1:0"
+HAIKU = "anthropic.claude-3-haiku-20240307-v1:0"
+TITAN_EMBED = "amazon.titan-embed-text-multilingual-v1:0"
+
+ROUTES = {
+    "classify":  {"model_id": SONNET, "max_tokens": 10, "temperature": 0},
+    "chat":      {"model_id": SONNET, "max_tokens": 400, "temperature": 0.3},
+    "summarize": {"model_id": SONNET, "max_tokens": 300, "temperature": 0.2},
+    "embed":     {"model_id": TITAN_EMBED},
+}
+
+CLASSIFY_PROMPT = (
+    "Clasifica el **sentimiento** del siguiente tweet en español como "
+    "'positive', 'neutral' o 'negative'. Devuelve solo esa palabra.\n\n"
+    "Tweet: «{text}»\nSentiment:"
+)
+
+
+def route(task: str) -> dict:
+    """Modelo y parámetros para `task`, con las sobrescrituras de entorno aplicadas."""
+    if task not in ROUTES:
+        raise KeyError(f"Tarea sin ruta: {task}")
+    cfg = dict(ROUTES[task])
+    cfg.update(json.loads(os.getenv("MODEL_ROUTES", "{}")).get(task, {}))
+    override = os.getenv(f"MODEL_ID_{task.upper()}")
+    if override:
+        cfg["model_id"] = override
+    return cfg
+
+
+def anthropic_body(prompt: str, max_tokens: int, temperature: float) -> dict:
+    return {
+        "anthropic_version": "bedrock-2023-05-31",
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+    }
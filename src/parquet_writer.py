@@ -0,0 +1,92 @@
+"""
+Escritura de lotes de tweets a Parquet sin pandas ni disco.
+
+El esquema está fijado: un lote sin valores en alguna columna (p. ej. todo
+`sentiment` nulo) produce los mismos tipos que cualquier otro, y los lectores
+pueden concatenar archivos sin promociones. El Parquet se comprime con zstd
+en un buffer en memoria (el llamador lo sube con un único `put_object`).
+
+Contrato para lectores: `sentiment` y `source` son dictionary(int8, string).
+pandas los lee como Categorical con SÓLO las categorías observadas en ese
+archivo (un archivo todo nulo trae un diccionario vacío), así que asignar un
+valor nuevo falla. Quien modifique y reescriba debe trabajar en Arrow o
+convertir antes a `object`, y escribir de vuelta con `to_table` (SCHEMA +
+metadatos created_at_min/max del footer); ver `batch_backfill.join` y
+`FinancialTweetAgent.ingest_s3_prefix`. Los lectores de sólo lectura
+(gráficas, isin/groupby) no necesitan cambios.
+
+Módulo sin dependencias de AWS: lo usan el Lambda de ingesta (se copia al
+ZIP con `tools/build_lambda.py`) y las herramientas que reescriben Parquets
+(`tools/batch_backfill.py join`).
+"""
+import datetime as dt
+import io
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+ROW_GROUP_SIZE = int(os.getenv("PARQUET_ROW_GROUP_SIZE", "50000"))
+ZSTD_LEVEL = int(os.getenv("PARQUET_ZSTD_LEVEL", "3"))
+
+_CATEGORY = pa.dictionary(pa.int8(), pa.string())
+
+SCHEMA = pa.schema([
+    ("tweet_id",   pa.int64()),
+    ("author_id",  pa.int64()),
+    ("created_at", pa.timestamp("us", tz="UTC")),
+    ("text",       pa.string()),
+    ("sentiment",  _CATEGORY),
+    ("error",      pa.string()),      # motivo si la clasificación falló (sentiment nulo)
+    ("tickers",    pa.list_(pa.string())),
+    ("source",     _CATEGORY),
+    ("is_futbol",  pa.bool_()),
+    ("is_app",     pa.bool_()),
+    ("futbol_terms", pa.list_(pa.string())),   # términos que activaron cada flag (auditoría)
+    ("app_terms",  pa.list_(pa.string())),
+])
+
+
+def event_hour(ts: dt.datetime) -> dt.datetime:
+    """Hora UTC (truncada) de un created_at tz-aware → partición hour=."""
+    return ts.astimezone(dt.timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def split_by_hour(rows: list[dict]) -> dict[dt.datetime, list[dict]]:
+    """{hora de created_at: filas ordenadas por created_at}."""
+    parts: dict[dt.datetime, list[dict]] = {}
+    for r in sorted(rows, key=lambda r: r["created_at"]):
+        parts.setdefault(event_hour(r["created_at"]), []).append(r)
+    return parts
+
+
+def to_table(rows: list[dict], schema: pa.Schema = SCHEMA) -> pa.Table:
+    """
+    Filas (dicts) → tabla Arrow con el esquema fijado; columnas ausentes quedan
+    nulas. El rango de created_at va a los metadatos del footer
+    (`created_at_min` / `created_at_max`, ISO-8601) para podar sin leer datos.
+    """
+    table = pa.Table.from_arrays(
+        [pa.array([r.get(f.name) for r in rows], type=f.type) for f in schema],
+        schema=schema,
+    )
+    ts = [r["created_at"] for r in rows if r.get("created_at") is not None]
+    if ts:
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            "created_at_min": min(ts).astimezone(dt.timezone.utc).isoformat(),
+            "created_at_max": max(ts).astimezone(dt.timezone.utc).isoformat(),
+        })
+    return table
+
+
+def to_parquet_bytes(table: pa.Table, row_group_size: int = ROW_GROUP_SIZE) -> bytes:
+    buf = io.BytesIO()
+    pq.write_table(
+        table, buf,
+        compression="zstd",
+        compression_level=ZSTD_LEVEL,
+        row_group_size=row_group_size,
+        write_statistics=True,          # min/max por row group → los lectores pueden saltarlos
+    )
+    return buf.getvalue()
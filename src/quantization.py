@@ -0,0 +1,305 @@
+"""
+Almacenamiento vectorial cuantizado a int8 (scale/offset por dimensión).
+
+• Los códigos int8 viven en RAM y sirven para la búsqueda de candidatos.
+• Los vectores float32 completos se guardan en disco (memmap) y sólo se
+  leen para re-rankear los mejores candidatos.
+• Documentos y metadatos también quedan en disco (records.jsonl + offsets).
+
+`QuantizedCollection` imita el subconjunto de la API de colecciones de
+Chroma que usa `VectorDB` (add / get / query / count), así que se puede
+intercambiar por una colección normal sin tocar al llamador.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+
+# ── Cuantizador escalar ───────────────────────────────────────────
+class ScalarQuantizer:
+    """Mapea cada dimensión de [lo, hi] a [-128, 127]."""
+
+    def __init__(self, lo: np.ndarray, hi: np.ndarray):
+        self.lo = lo.astype(np.float32)
+        self.hi = hi.astype(np.float32)
+        self.scale = np.maximum(self.hi - self.lo, 1e-8) / 255.0
+
+    @classmethod
+    def fit(cls, X: np.ndarray) -> "ScalarQuantizer":
+        return cls(X.min(axis=0), X.max(axis=0))
+
+    def encode(self, X: np.ndarray) -> np.ndarray:
+        q = np.rint((X - self.lo) / self.scale) - 128
+        return np.clip(q, -128, 127).astype(np.int8)
+
+    def decode(self, Q: np.ndarray) -> np.ndarray:
+        return (Q.astype(np.float32) + 128) * self.scale + self.lo
+
+    def scores(self, Q: np.ndarray, q: np.ndarray, chunk: int = 4096) -> np.ndarray:
+        """
+        Producto punto aproximado decode(Q)·q sin materializar decode(Q):
+        (Q+128)·(scale*q) + lo·q, por bloques para acotar la memoria temporal.
+        """
+        w = (self.scale * q).astype(np.float32)
+        bias = float(self.lo @ q) + 128.0 * float(w.sum())
+        out = np.empty(len(Q), dtype=np.float32)
+        for i in range(0, len(Q), chunk):
+            out[i : i + chunk] = Q[i : i + chunk].astype(np.float32) @ w
+        return out + bias
+
+
+_OPS = {
+    "$eq": lambda a, b: a == b, "$ne": lambda a, b: a != b,
+    "$gt": lambda a, b: a > b, "$gte": lambda a, b: a >= b,
+    "$lt": lambda a, b: a < b, "$lte": lambda a, b: a <= b,
+}
+
+
+def _matches(meta: dict, where: dict | None) -> bool:
+    """Subconjunto del filtro `where` de Chroma: $and / $or y comparaciones por campo."""
+    if not where:
+        return True
+    if "$and" in where:
+        return all(_matches(meta, w) for w in where["$and"])
+    if "$or" in where:
+        return any(_matches(meta, w) for w in where["$or"])
+    for field, cond in where.items():
+        value = meta.get(field)
+        ops = cond if isinstance(cond, dict) else {"$eq": cond}
+        if value is None or not all(_OPS[op](value, ref) for op, ref in ops.items()):
+            return False
+    return True
+
+
+def _normalize(X: np.ndarray) -> np.ndarray:
+    X = np.asarray(X, dtype=np.float32)
+    return X / np.maximum(np.linalg.norm(X, axis=1, keepdims=True), 1e-12)
+
+
+# ── Colección cuantizada persistente ─────────────────────────────
+def _is_number(v) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+class QuantizedCollection:
+    """
+    Índice plano int8 + re-ranking float32 (similitud coseno).
+
+    Archivos en `path/`:
+      params.npz   → lo / hi del cuantizador
+      codes.i8     → códigos int8 (se cargan en RAM)
+      vectors.f32  → vectores normalizados float32 (memmap, sólo lectura)
+      records.jsonl→ id, documento y metadatos por fila
+
+    En RAM sólo quedan los códigos, los ids, el offset de cada fila en
+    records.jsonl y los metadatos numéricos como columnas numpy (el `ts` de
+    las particiones, para filtrar sin leer el disco). Documentos y resto de
+    metadatos se leen de records.jsonl para las filas que se devuelven.
+    """
+
+    def __init__(self, path, rerank_factor: int = 4):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.rerank_factor = rerank_factor
+        self.quantizer: ScalarQuantizer | None = None
+        self.dim = 0
+        self.ids: list[str] = []
+        self._index: dict[str, int] = {}
+        self._offsets = np.empty(0, dtype=np.int64)   # byte de inicio de cada fila en records.jsonl
+        self._cols: dict[str, np.ndarray] = {}        # metadato numérico → columna float64
+        self._mixed: set[str] = set()                 # campos con valores no numéricos
+        self.codes = np.empty((0, 0), dtype=np.int8)
+        self._load()
+
+    # ── persistencia ──────────────────────────────────────────────
+    @property
+    def _vectors_file(self) -> Path:
+        return self.path / "vectors.f32"
+
+    @property
+    def _records_file(self) -> Path:
+        return self.path / "records.jsonl"
+
+    def _load(self):
+        params = self.path / "params.npz"
+        if not params.exists():
+            return
+        p = np.load(params)
+        self.quantizer = ScalarQuantizer(p["lo"], p["hi"])
+        self.dim = len(p["lo"])
+        self.codes = np.fromfile(self.path / "codes.i8", dtype=np.int8).reshape(-1, self.dim)
+        offsets, metas, pos = [], [], 0
+        with open(self._records_file, "rb") as f:
+            for line in f:
+                rec = json.loads(line)
+                offsets.append(pos)
+                pos += len(line)
+                self.ids.append(rec["id"])
+                metas.append(rec.get("metadata") or {})
+        self._offsets = np.array(offsets, dtype=np.int64)
+        self._index = {i: n for n, i in enumerate(self.ids)}
+        self._append_cols(metas, 0)
+
+    def _append_cols(self, metas: list[dict], n0: int):
+        """Extiende las columnas numéricas con las filas n0… (NaN si falta el campo)."""
+        for key in {k for m in metas for k in m} - self._mixed - set(self._cols):
+            self._cols[key] = np.full(n0, np.nan)
+        for key in list(self._cols):
+            vals = [m.get(key) for m in metas]
+            if not all(v is None or _is_number(v) for v in vals):
+                self._mixed.add(key)              # se filtra leyendo el disco
+                del self._cols[key]
+                continue
+            new = np.array([np.nan if v is None else v for v in vals], dtype=np.float64)
+            self._cols[key] = np.concatenate([self._cols[key], new])
+
+    def _vectors(self) -> np.ndarray:
+        return np.memmap(self._vectors_file, dtype=np.float32, mode="r").reshape(-1, self.dim)
+
+    def _read(self, rows) -> list[dict]:
+        """Registros (id, document, metadata) de `rows`, leídos por offset."""
+        with open(self._records_file, "rb") as f:
+            out = []
+            for r in rows:
+                f.seek(int(self._offsets[r]))
+                out.append(json.loads(f.readline()))
+        return out
+
+    def _scan(self, where: dict) -> np.ndarray:
+        with open(self._records_file, "rb") as f:
+            return np.array([_matches(json.loads(line).get("metadata") or {}, where) for line in f],
+                            dtype=bool)
+
+    def _mask(self, where: dict) -> np.ndarray:
+        """`where` evaluado sobre todas las filas (columnas en RAM; si no, desde disco)."""
+        n = len(self.ids)
+        if "$and" in where or "$or" in where:
+            parts = [self._mask(w) for w in where.get("$and", where.get("$or"))]
+            if "$and" in where:
+                return np.logical_and.reduce(parts) if parts else np.ones(n, dtype=bool)
+            return np.logical_or.reduce(parts) if parts else np.zeros(n, dtype=bool)
+        out = np.ones(n, dtype=bool)
+        for field, cond in where.items():
+            ops = cond if isinstance(cond, dict) else {"$eq": cond}
+            col = self._cols.get(field)
+            if col is None and field not in self._mixed:
+                return np.zeros(n, dtype=bool)        # ninguna fila tiene el campo
+            if col is None or not all(_is_number(ref) for ref in ops.values()):
+                out &= self._scan({field: cond})
+                continue
+            out &= ~np.isnan(col)
+            for op, ref in ops.items():
+                out &= _OPS[op](col, ref)
+        return out
+
+    # ── API tipo Chroma ───────────────────────────────────────────
+    def count(self) -> int:
+        return len(self.ids)
+
+    def _fit(self, lo: np.ndarray, hi: np.ndarray):
+        self.quantizer = ScalarQuantizer(lo, hi)
+        np.savez(self.path / "params.npz", lo=self.quantizer.lo, hi=self.quantizer.hi)
+
+    def _reencode(self, chunk: int = 8192):
+        """Re-cuantiza todos los vectores float32 del disco con los rangos actuales."""
+        vectors = self._vectors()
+        self.codes = np.concatenate(
+            [self.quantizer.encode(vectors[i : i + chunk]) for i in range(0, len(vectors), chunk)]
+        ) if len(vectors) else np.empty((0, self.dim), dtype=np.int8)
+        self.codes.tofile(self.path / "codes.i8")
+
+    def add(self, ids, documents, embeddings, metadatas=None):
+        X = _normalize(embeddings)
+        if self.quantizer is None:
+            self.dim = X.shape[1]
+            self.codes = np.empty((0, self.dim), dtype=np.int8)
+            self._fit(X.min(axis=0), X.max(axis=0))
+
+        with open(self._vectors_file, "ab") as f:
+            X.tofile(f)
+        lo = np.minimum(self.quantizer.lo, X.min(axis=0))
+        hi = np.maximum(self.quantizer.hi, X.max(axis=0))
+        if np.any(lo < self.quantizer.lo) or np.any(hi > self.quantizer.hi):
+            # el lote cae fuera del rango ajustado: se amplía y se re-codifica todo
+            # (incluido el lote nuevo) desde los float32 en disco, en vez de saturar
+            self._fit(lo, hi)
+            self._reencode()
+            codes = None
+        else:
+            codes = self.quantizer.encode(X)
+            with open(self.path / "codes.i8", "ab") as f:
+                codes.tofile(f)
+        metadatas = [m or {} for m in (metadatas or [None] * len(ids))]
+        pos = self._records_file.stat().st_size if self._records_file.exists() else 0
+        offsets = []
+        with open(self._records_file, "ab") as f:
+            for i, d, m in zip(ids, documents, metadatas):
+                line = (json.dumps({"id": i, "document": d, "metadata": m or None},
+                                   ensure_ascii=False) + "\n").encode("utf-8")
+                f.write(line)
+                offsets.append(pos)
+                pos += len(line)
+        n0 = len(self.ids)
+        for i in ids:
+            self._index[i] = len(self.ids)
+            self.ids.append(i)
+        self._offsets = np.concatenate([self._offsets, np.array(offsets, dtype=np.int64)])
+        self._append_cols(metadatas, n0)
+        if codes is not None:
+            self.codes = np.concatenate([self.codes, codes])
+
+    def get(self, ids=None, where=None, include=("documents", "metadatas")):
+        rows = np.arange(len(self.ids)) if ids is None else np.array(
+            [self._index[i] for i in ids if i in self._index], dtype=np.int64
+        )
+        if where:
+            rows = rows[self._mask(where)[rows]]
+        out = {"ids": [self.ids[r] for r in rows]}
+        if "documents" in include or "metadatas" in include:
+            recs = self._read(rows)
+            if "documents" in include:
+                out["documents"] = [rec["document"] for rec in recs]
+            if "metadatas" in include:
+                out["metadatas"] = [rec.get("metadata") or {} for rec in recs]
+        if "embeddings" in include:
+            out["embeddings"] = self._vectors()[rows].tolist() if len(rows) else []
+        return out
+
+    def query(self, query_embeddings, n_results: int = 10, where=None,
+              include=("documents", "metadatas", "distances")):
+        keys = ("ids", "documents", "metadatas", "distances", "embeddings")
+        res = {k: [] for k in keys}
+        allowed = self._mask(where) if where else None
+        n_allowed = len(self.ids) if allowed is None else int(allowed.sum())
+        if not n_allowed:
+            return {k: [[] for _ in query_embeddings] for k in keys}
+
+        vectors = self._vectors()
+        n_results = min(n_results, n_allowed)
+        for q in _normalize(query_embeddings):
+            n_cand = min(n_allowed, n_results * self.rerank_factor)
+            approx = self.quantizer.scores(self.codes, q)
+            if allowed is not None:
+                approx[~allowed] = -np.inf            # el filtro va antes del top-k
+            cand = np.sort(np.argpartition(-approx, n_cand - 1)[:n_cand])
+            exact = vectors[cand] @ q                       # re-ranking float32
+            order = np.argsort(-exact)[:n_results]
+            rows = cand[order]
+            recs = self._read(rows) if "documents" in include or "metadatas" in include else []
+            res["ids"].append([self.ids[r] for r in rows])
+            res["documents"].append([rec["document"] for rec in recs])
+            res["metadatas"].append([rec.get("metadata") or {} for rec in recs])
+            res["distances"].append((1.0 - exact[order]).tolist())
+            if "embeddings" in include:
+                res["embeddings"].append(vectors[rows].tolist())
+        return {k: v for k, v in res.items() if k == "ids" or k in include}
+
+    def nbytes(self) -> dict:
+        """Arreglos numpy en RAM (códigos, offsets, columnas) vs. tamaños en disco."""
+        return {
+            "resident_int8": int(self.codes.nbytes),
+            "resident_index": int(self._offsets.nbytes + sum(c.nbytes for c in self._cols.values())),
+            "disk_float32": int(self._vectors_file.stat().st_size) if self._vectors_file.exists() else 0,
+            "disk_records": int(self._records_file.stat().st_size) if self._records_file.exists() else 0,
+        }
@@ -0,0 +1,102 @@
+"""
+Ejecución concurrente con límites de tasa compartidos (Bedrock, API de X).
+
+• TokenBucket: `rate` peticiones/s con ráfaga `burst`, compartido por todos
+  los hilos. `backoff(delay)` pausa *a todos* los workers: un throttle frena
+  el ritmo global, no sólo al hilo que lo recibió.
+• run_ordered: aplica `fn` a cada elemento en un pool acotado y devuelve los
+  resultados en el orden de entrada junto con los fallos parciales.
+
+• ENDPOINT_LIMITS: un TokenBucket por endpoint de la API de X, compartido
+  por todas las búsquedas concurrentes (ver la cuota del plan contratado).
+
+Variables de entorno: BEDROCK_RPM (100) · BEDROCK_BURST (5) · CLASSIFY_WORKERS (4)
+  TWITTER_SEARCH_RPM (30) · TWITTER_SEARCH_BURST (3) · TWITTER_FETCH_WORKERS (8)
+  TWITTER_MAX_BACKOFF_S (60) · TWITTER_RATE_RETRIES (3)
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloquea hasta obtener un token (y hasta que termine cualquier pausa global)."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._paused_until:
+                    self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                    self._last = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+                else:
+                    wait = self._paused_until - now
+            time.sleep(wait)
+
+    def backoff(self, delay: float):
+        """Pausa global: ningún worker obtiene token hasta dentro de `delay` s."""
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + delay * random.uniform(0.8, 1.2))
+            self._tokens = 0.0
+            self._last = now
+
+
+LIMITER = TokenBucket(
+    rate=float(os.getenv("BEDROCK_RPM", "100")) / 60,
+    burst=int(os.getenv("BEDROCK_BURST", "5")),
+)
+WORKERS = int(os.getenv("CLASSIFY_WORKERS", "4"))
+
+ENDPOINT_LIMITS = {
+    "search_recent_tweets": TokenBucket(
+        rate=float(os.getenv("TWITTER_SEARCH_RPM", "30")) / 60,
+        burst=int(os.getenv("TWITTER_SEARCH_BURST", "3")),
+    ),
+}
+FETCH_WORKERS = int(os.getenv("TWITTER_FETCH_WORKERS", "8"))
+MAX_BACKOFF_S = float(os.getenv("TWITTER_MAX_BACKOFF_S", "60"))
+RATE_RETRIES = int(os.getenv("TWITTER_RATE_RETRIES", "3"))
+
+
+def reset_delay(exc, default: float = 15.0) -> float:
+    """
+    Segundos hasta `x-rate-limit-reset` de un 429 de la API de X (tweepy
+    TooManyRequests), acotado a MAX_BACKOFF_S; `default` si no viene la cabecera.
+    """
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        delay = float(headers["x-rate-limit-reset"]) - time.time() + 1
+    except (KeyError, TypeError, ValueError):
+        delay = default
+    return min(max(delay, 1.0), MAX_BACKOFF_S)
+
+
+def run_ordered(fn, items, max_workers: int = WORKERS):
+    """([resultado | None por item, en orden], [(índice, error)])."""
+    results = [None] * len(items)
+    errors = []
+    if not items:
+        return results, errors
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+        futures = {pool.submit(fn, item): i for i, item in enumerate(items)}
+        for fut in as_completed(futures):
+            i = futures[fut]
+            try:
+                results[i] = fut.result()
+            except Exception as e:
+                errors.append((i, f"{type(e).__name__}: {e}"))
+    return results, sorted(errors)
@@ -0,0 +1,112 @@
+"""
+Caché en disco (SQLite) de respuestas de Bedrock.
+
+Clave = sha256(model_id + cuerpo JSON canónico). Sólo se cachean llamadas
+deterministas (temperature 0) o las que piden explícitamente un TTL.
+Al superar `max_bytes` se expulsan las entradas menos usadas recientemente.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+def cache_key(model_id: str, body: dict) -> str:
+    canon = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(f"{model_id}\n{canon}".encode()).hexdigest()
+
+
+def is_cacheable(body: dict, ttl: float | None) -> bool:
+    return ttl is not None or body.get("temperature") == 0
+
+
+class ResponseCache:
+    def __init__(self, path: str, max_bytes: int = 64 * 2**20):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+            " expires REAL, last_access REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, model_id: str, body: dict) -> dict | None:
+        key, now = cache_key(model_id, body), time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expires FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and row[1] is not None and row[1] < now:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                self._db.commit()
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        return json.loads(row[0])
+
+    def put(self, model_id: str, body: dict, response: dict, ttl: float | None = None):
+        value, now = json.dumps(response, ensure_ascii=False), time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (cache_key(model_id, body), value, len(value),
+                 now + ttl if ttl is not None else None, now),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        for key, size in self._db.execute(
+            "SELECT key, size FROM responses ORDER BY last_access"
+        ).fetchall():
+            if total - freed <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            freed += size
+
+    def stats(self) -> dict:
+        with self._lock:
+            n, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": n, "bytes": size}
+
+
+_default: ResponseCache | None = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> ResponseCache:
+    """
+    Caché del proceso en BEDROCK_CACHE_PATH (se crea al primer uso, thread-safe).
+    El Lambda la apunta a /tmp (único directorio escribible).
+    """
+    global _default
+    if _default is not None:
+        return _default
+    with _default_lock:                  # workers concurrentes: una sola instancia
+        if _default is None:
+            _default = ResponseCache(
+                os.getenv("BEDROCK_CACHE_PATH", ".cache/bedrock.sqlite"),
+                max_bytes=int(os.getenv("BEDROCK_CACHE_MAX_BYTES", str(64 * 2**20))),
+            )
+    return _default
@@ -0,0 +1,47 @@
+"""Utilidades de similitud para deduplicación semántica y re-ranking MMR."""
+import numpy as np
+
+
+def normalize(X) -> np.ndarray:
+    X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+    return X / np.maximum(np.linalg.norm(X, axis=1, keepdims=True), 1e-12)
+
+
+def near_duplicates(embeds, threshold: float) -> list[int | None]:
+    """
+    Para cada vector, índice del primer vector *anterior* del lote con
+    similitud coseno ≥ threshold (None si es único). Greedy, O(n·únicos).
+    """
+    X = normalize(embeds)
+    kept: list[int] = []
+    out: list[int | None] = []
+    for j, v in enumerate(X):
+        if kept:
+            sims = X[kept] @ v
+            best = int(np.argmax(sims))
+            if sims[best] >= threshold:
+                out.append(kept[best])
+                continue
+        kept.append(j)
+        out.append(None)
+    return out
+
+
+def mmr(query_emb, doc_embs, k: int, lambda_mult: float = 0.5) -> list[int]:
+    """
+    Maximal Marginal Relevance: elige k índices de `doc_embs` equilibrando
+    relevancia con la consulta (lambda_mult=1) y diversidad (lambda_mult=0).
+    """
+    if len(doc_embs) == 0:
+        return []
+    D = normalize(doc_embs)
+    rel = D @ normalize(query_emb)[0]
+    selected = [int(np.argmax(rel))]
+    max_sim = D @ D[selected[0]]                  # similitud máx. con lo ya elegido
+    while len(selected) < min(k, len(D)):
+        score = lambda_mult * rel - (1 - lambda_mult) * max_sim
+        score[selected] = -np.inf
+        nxt = int(np.argmax(score))
+        selected.append(nxt)
+        max_sim = np.maximum(max_sim, D @ D[nxt])
+    return selected
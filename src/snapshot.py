@@ -0,0 +1,96 @@
+"""
+Snapshots del índice vectorial para arranque en caliente de contenedores.
+
+Un snapshot son dos archivos en un directorio local o en `s3://bucket/prefijo`:
+  snapshot.tar.gz → directorio de la vector DB (+ corpus.parquet con el DataFrame)
+  manifest.json   → sha256 del tar, fecha, nº de documentos y keys S3 ya ingeridas
+
+Exportar y restaurar dejan además una copia del manifest en el directorio de
+la DB: describe el corpus.parquet local aunque no se vuelva a restaurar.
+"""
+import hashlib
+import json
+import shutil
+import tarfile
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+ARCHIVE = "snapshot.tar.gz"
+MANIFEST = "manifest.json"
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _is_s3(uri: str) -> bool:
+    return uri.startswith("s3://")
+
+
+# ── Exportar ──────────────────────────────────────────────────────
+def export_snapshot(db_path: str, dest: str, ingested_keys=(), n_docs: int = 0) -> dict:
+    """Empaqueta `db_path` y lo publica en `dest` (dir local o s3://…)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = Path(tmp) / ARCHIVE
+        with tarfile.open(archive, "w:gz") as tar:
+            tar.add(db_path, arcname=".",   # la copia local del manifest no va en el tar
+                    filter=lambda ti: None if ti.name == f"./{MANIFEST}" else ti)
+        manifest = {
+            "sha256": _sha256(archive),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "n_docs": int(n_docs),
+            "ingested_keys": sorted(ingested_keys),
+        }
+        (Path(tmp) / MANIFEST).write_text(json.dumps(manifest))
+
+        if _is_s3(dest):
+            import s3fs                 # sólo con URIs s3:// (como en ingest_s3_prefix)
+            fs = s3fs.S3FileSystem()
+            # el tar primero: un manifest visible siempre apunta a un tar completo
+            fs.put(str(archive), f"{dest.rstrip('/')}/{ARCHIVE}")
+            fs.put(str(Path(tmp) / MANIFEST), f"{dest.rstrip('/')}/{MANIFEST}")
+        else:
+            Path(dest).mkdir(parents=True, exist_ok=True)
+            shutil.copy(archive, Path(dest) / ARCHIVE)
+            shutil.copy(Path(tmp) / MANIFEST, Path(dest) / MANIFEST)
+        shutil.copy(Path(tmp) / MANIFEST, Path(db_path) / MANIFEST)
+    return manifest
+
+
+# ── Restaurar ─────────────────────────────────────────────────────
+def restore_snapshot(src: str, db_path: str) -> dict | None:
+    """
+    Descarga y verifica el snapshot y lo extrae en `db_path`.
+    Devuelve el manifest, o None si no hay snapshot en `src`.
+    Lanza ValueError si el checksum no coincide (no se toca `db_path`).
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        archive, manifest_file = Path(tmp) / ARCHIVE, Path(tmp) / MANIFEST
+        if _is_s3(src):
+            import s3fs                 # sólo con URIs s3:// (como en ingest_s3_prefix)
+            fs = s3fs.S3FileSystem()
+            base = src.rstrip("/")
+            if not fs.exists(f"{base}/{MANIFEST}"):
+                return None
+            fs.get(f"{base}/{MANIFEST}", str(manifest_file))
+            fs.get(f"{base}/{ARCHIVE}", str(archive))
+        else:
+            if not (Path(src) / MANIFEST).exists():
+                return None
+            shutil.copy(Path(src) / MANIFEST, manifest_file)
+            shutil.copy(Path(src) / ARCHIVE, archive)
+
+        manifest = json.loads(manifest_file.read_text())
+        if _sha256(archive) != manifest["sha256"]:
+            raise ValueError(f"Checksum inválido en snapshot {src}")
+
+        Path(db_path).mkdir(parents=True, exist_ok=True)
+        with tarfile.open(archive, "r:gz") as tar:
+            tar.extractall(db_path, filter="data")
+        shutil.copy(manifest_file, Path(db_path) / MANIFEST)
+    return manifest
@@ -1,6 +1,9 @@
 import os
 import tweepy
-from time import sleep
+
+from src.rate_limit import ENDPOINT_LIMITS, FETCH_WORKERS, RATE_RETRIES, reset_delay, run_ordered
+
+SEARCH_LIMIT = ENDPOINT_LIMITS["search_recent_tweets"]
 
 # ── Lista de cuentas financieras ──
 handles = [
@@ -18,7 +21,7 @@ handles = [
 # ── autenticación ────────────────────────────────────────────────
 client = tweepy.Client(
     bearer_token=os.getenv("TWITTER_BEARER"),
-    wait_on_rate_limit=True,
+    wait_on_rate_limit=False,     # el 429 lo maneja _safe_request (pausa global)
 )
 
 # ── helpers ───────────────────────────────────────────────────────
@@ -38,13 +41,19 @@ def chunked_queries(handles_list, max_len=512) -> list[str]:
 
 
 def _safe_request(fun, *args, **kwargs):
-    """Envuelve la llamada a la API para manejar rate-limits."""
-    try:
-        return fun(*args, **kwargs)
-    except tweepy.TooManyRequests:
-        sleep(15)
-    except Exception as e:
-        print(f"[Twitter error] {e}")
+    """
+    Envuelve la llamada a la API: espera turno en el límite del endpoint y,
+    ante un 429, pausa a *todas* las búsquedas en curso.
+    """
+    for _ in range(RATE_RETRIES + 1):
+        SEARCH_LIMIT.acquire()
+        try:
+            return fun(*args, **kwargs)
+        except tweepy.TooManyRequests as e:
+            SEARCH_LIMIT.backoff(reset_delay(e))
+        except Exception as e:
+            print(f"[Twitter error] {e}")
+            return None
     return None
 
 # ── búsqueda principal ───────────────────────────────────────────
@@ -61,19 +70,19 @@ def search(query: str | None = None, n: int = 30) -> list[dict]:
             return []
         tweets = resp.data
     else:
-        collected = []
-        for q in chunked_queries(handles.copy()):
-            resp = _safe_request(
+        # todos los chunks a la vez: el tiempo lo marca el chunk más lento
+        resps, _ = run_ordered(
+            lambda q: _safe_request(
                 client.search_recent_tweets,
                 query=q,
                 tweet_fields=["id", "text", "created_at", "lang"],
                 max_results=100,
-            )
-            if resp and resp.data:
-                collected.extend(resp.data)
-            if len(collected) >= n:
-                break
-        tweets = collected[:n]
+            ),
+            chunked_queries(handles.copy()),
+            max_workers=FETCH_WORKERS,
+        )
+        by_id = {t.id: t for r in resps if r and r.data for t in r.data}
+        tweets = sorted(by_id.values(), key=lambda t: t.id, reverse=True)[:n]   # más recientes
 
     return [
         {"doc_id": str(t.id), "text": t.text, "created_at": t.created_at}
@@ -1,7 +1,29 @@
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
 import streamlit as st
 from chromadb import PersistentClient
+from chromadb.api.client import SharedSystemClient
 from sentence_transformers import SentenceTransformer
 from src.bedrock_client import titan_embed          # ← Bedrock Titan
+from src.circuit_breaker import CircuitBreaker
+from src.quantization import QuantizedCollection
+from src.retrieval import mmr, near_duplicates
+
+BASE_NAME = "tweets"
+
+# Titan caído o sin credenciales → tras N fallos se salta directo a Mini-LM
+TITAN_BREAKER = CircuitBreaker(
+    "titan_embed",
+    failure_threshold=int(os.getenv("TITAN_BREAKER_FAILURES", "3")),
+    cooldown_s=float(os.getenv("TITAN_BREAKER_COOLDOWN_S", "60")),
+)
+
+# Formato del sufijo de cada partición temporal (coincide con year=/month=/day= del Lambda)
+PARTITION_FORMATS = {"month": "%Y_%m", "day": "%Y_%m_%d"}
 
 # ───────────────────────────────────────────────────────────────────
 # 1) Modelo local (backup, CPU)
@@ -12,47 +34,279 @@ def load_embedder() -> SentenceTransformer:
     return SentenceTransformer("all-MiniLM-L6-v2", device="cpu")
 
 
+def hnsw_metadata(m: int | None = None, ef_construction: int | None = None,
+                  ef_search: int | None = None) -> dict:
+    """Metadatos de colección Chroma; None → default de Chroma."""
+    meta = {"hnsw:space": "cosine"}
+    if m is not None:
+        meta["hnsw:M"] = m
+    if ef_construction is not None:
+        meta["hnsw:construction_ef"] = ef_construction
+    if ef_search is not None:
+        meta["hnsw:search_ef"] = ef_search
+    return meta
+
+
+def _utc_naive(ts) -> pd.Timestamp:
+    ts = pd.Timestamp(ts)
+    return ts.tz_convert("UTC").tz_localize(None) if ts.tzinfo else ts
+
+
 class VectorDB:
-    def __init__(self, path: str = "chroma_db"):
-        self.client = PersistentClient(path)
-        self.collection = self.client.get_or_create_collection(
-            name="tweets", metadata={"hnsw:space": "cosine"}
-        )
+    def __init__(self, path: str = "chroma_db", quantized: bool = False, rerank_factor: int = 4,
+                 hnsw_m: int | None = None, ef_construction: int | None = None,
+                 ef_search: int | None = None, partition: str | None = None):
+        """
+        quantized=True → índice int8 en RAM + re-ranking float32 desde disco
+        (menos memoria residente que la colección HNSW de Chroma; la RSS
+        real de ambos la mide `tools/bench_quantization.py`).
+        hnsw_m / ef_construction / ef_search → parámetros HNSW elegidos con
+        `tools/bench_hnsw.py`. M y ef_construction sólo aplican al crear la
+        colección; una colección existente conserva los suyos.
+        partition="month"|"day" → una colección por periodo (`tweets_2024_05`);
+        las consultas sólo visitan las particiones que solapan el rango pedido.
+        """
+        if partition is not None and partition not in PARTITION_FORMATS:
+            raise ValueError(f"partition debe ser una de {list(PARTITION_FORMATS)}")
+        self.path = path
+        self.partition = partition
+        self.rerank_factor = rerank_factor
+        self._hnsw = hnsw_metadata(hnsw_m, ef_construction, ef_search)
+        self._collections = {}
+        if quantized:
+            self.client = None
+            self._quant_root = Path(path) / "int8"
+        else:
+            self.client = PersistentClient(path)
+            self._quant_root = None
+        self.collection = None if partition else self._collection(BASE_NAME)
         self.embedder = load_embedder()   # por si Titan falla
 
+    def close(self):
+        """
+        Detiene el cliente Chroma (SQLite + segmentos HNSW quedan cerrados en
+        disco) para poder copiar `path`, p. ej. al exportar un snapshot.
+        `reopen()` lo vuelve a abrir sin recargar el embedder.
+        """
+        self._collections.clear()
+        self.collection = None
+        if self.client is not None:
+            self.client._system.stop()
+            SharedSystemClient.clear_system_cache()   # si no, reabrir devuelve el sistema detenido
+            self.client = None
+
+    def reopen(self):
+        if self._quant_root is None:
+            self.client = PersistentClient(self.path)
+        self.collection = None if self.partition else self._collection(BASE_NAME)
+
+    # ── particiones ────────────────────────────────────────────────
+    def _collection(self, name: str):
+        if name not in self._collections:
+            if self._quant_root is not None:
+                self._collections[name] = QuantizedCollection(
+                    self._quant_root / name, rerank_factor=self.rerank_factor
+                )
+            else:
+                self._collections[name] = self.client.get_or_create_collection(
+                    name=name, metadata=self._hnsw
+                )
+        return self._collections[name]
+
+    def _partition_name(self, ts: pd.Timestamp) -> str:
+        return f"{BASE_NAME}_{ts.strftime(PARTITION_FORMATS[self.partition])}"
+
+    def _partition_range(self, name: str) -> tuple[pd.Timestamp, pd.Timestamp]:
+        start = pd.Timestamp(datetime.strptime(name[len(BASE_NAME) + 1:],
+                                               PARTITION_FORMATS[self.partition]))
+        step = pd.DateOffset(months=1) if self.partition == "month" else pd.DateOffset(days=1)
+        return start, start + step
+
+    def partitions(self) -> list[str]:
+        """Nombres de partición existentes, en orden cronológico."""
+        if not self.partition:
+            return [BASE_NAME]
+        if self._quant_root is not None:
+            names = [p.name for p in self._quant_root.glob(f"{BASE_NAME}_*") if p.is_dir()]
+        else:
+            names = [c.name for c in self.client.list_collections()]
+        return sorted(n for n in names if n.startswith(f"{BASE_NAME}_"))
+
+    def _overlapping(self, start=None, end=None) -> list[str]:
+        if not self.partition:
+            return [BASE_NAME]
+        start = _utc_naive(start) if start is not None else None
+        end = _utc_naive(end) if end is not None else None
+        out = []
+        for name in self.partitions():
+            p_start, p_end = self._partition_range(name)
+            if (start is None or p_end > start) and (end is None or p_start <= end):
+                out.append(name)
+        return out
+
+    def apply_retention(self, keep: int) -> list[str]:
+        """Borra las particiones más antiguas y conserva las `keep` más recientes."""
+        if not self.partition:
+            return []
+        dropped = self.partitions()[:-keep] if keep > 0 else self.partitions()
+        for name in dropped:
+            self._collections.pop(name, None)
+            if self._quant_root is not None:
+                shutil.rmtree(self._quant_root / name, ignore_errors=True)
+            else:
+                self.client.delete_collection(name)
+        return dropped
+
+    # ── embeddings ─────────────────────────────────────────────────
+    def _embed(self, texts):
+        if TITAN_BREAKER.allow():
+            try:
+                out = titan_embed(texts)
+                TITAN_BREAKER.record_success()
+                return out
+            except Exception as e:
+                TITAN_BREAKER.record_failure()
+                st.warning(f"Titan Embed falló ({e}); uso Mini-LM local.")
+        return self.embedder.encode(texts, batch_size=64, device="cpu").tolist()
+
     # ── helper deduplicación ───────────────────────────────────────
-    def _filter_new(self, ids, texts, embeds):
-        existing = set(self.collection.get(ids=ids, include=[])["ids"])
-        out_ids, out_txt, out_emb = [], [], []
-        for i, t, e in zip(ids, texts, embeds):
-            if i not in existing:
-                out_ids.append(i), out_txt.append(t), out_emb.append(e)
-        return out_ids, out_txt, out_emb
+    def _filter_new(self, collection, rows):
+        existing = set(collection.get(ids=[r[0] for r in rows], include=[])["ids"])
+        return [r for r in rows if r[0] not in existing]
+
+    # ── near-duplicates semánticos ─────────────────────────────────
+    def _near_duplicates(self, collection, ids, embeds, threshold: float) -> list[str | None]:
+        """
+        id canónico para cada vector a distancia coseno ≤ 1-threshold de uno
+        ya indexado en la colección o de uno anterior del mismo lote.
+        """
+        canon: list[str | None] = [None] * len(ids)
+        if collection.count():
+            res = collection.query(query_embeddings=list(embeds), n_results=1,
+                                   include=["distances"])
+            for j, (hit, dist) in enumerate(zip(res["ids"], res["distances"])):
+                if hit and dist[0] <= 1 - threshold:
+                    canon[j] = hit[0]
+        for j, first in enumerate(near_duplicates(embeds, threshold)):
+            if canon[j] is None and first is not None:
+                canon[j] = canon[first] or ids[first]
+        return canon
 
     # ── Añadir documentos ──────────────────────────────────────────
-    def add(self, ids, texts, embeddings=None):
+    def add(self, ids, texts, embeddings=None, timestamps=None,
+            dedup_threshold: float | None = None, dedup_mode: str = "skip",
+            retention: int | None = None):
         """
         Inserta documentos:
+        • Deduplica por doc_id *antes* de embeber: re-añadir un corpus ya
+          indexado (p. ej. tras restaurar un snapshot) no llama a Titan.
         • Si embeddings==None → llama Titan Embed (Bedrock).
-        • Deduplica por doc_id para evitar duplicados.
+        • Con particiones, `timestamps` (created_at) decide la colección
+          destino; sin timestamp se usa el periodo actual (UTC).
+        • dedup_threshold (similitud coseno, p. ej. 0.95) → near-duplicates
+          semánticos (titulares sindicados) dentro de la misma partición:
+          dedup_mode="skip" no los inserta; "link" los inserta con
+          metadata `dup_of=<id canónico>`.
+        • retention (nº de particiones que conservará `apply_retention`) →
+          descarta antes de embeber las filas de particiones que quedarían
+          fuera, en vez de re-crearlas para borrarlas después.
         """
-        if embeddings is None:
-            try:
-                embeddings = titan_embed(texts)
-            except Exception as e:
-                st.warning(f"Titan Embed falló ({e}); uso Mini-LM local.")
-                embeddings = self.embedder.encode(texts, batch_size=64, device="cpu").tolist()
+        if dedup_mode not in ("skip", "link"):
+            raise ValueError("dedup_mode debe ser 'skip' o 'link'")
+        embeds = embeddings if embeddings is not None else [None] * len(ids)
+        if not self.partition:
+            groups = {BASE_NAME: [(i, t, e, {}) for i, t, e in zip(ids, texts, embeds)]}
+        else:
+            now = _utc_naive(pd.Timestamp.now("UTC"))
+            timestamps = timestamps if timestamps is not None else [None] * len(ids)
+            groups = {}
+            for i, t, e, ts in zip(ids, texts, embeds, timestamps):
+                ts = now if ts is None or pd.isna(ts) else _utc_naive(ts)
+                groups.setdefault(self._partition_name(ts), []).append(
+                    (i, t, e, {"ts": int(ts.timestamp())})
+                )
+            if retention:
+                kept = set(sorted(set(self.partitions()) | set(groups))[-retention:])
+                groups = {name: rows for name, rows in groups.items() if name in kept}
+
+        for name, rows in groups.items():
+            col = self._collection(name)
+            rows = self._filter_new(col, rows)
+            if not rows:
+                continue
+            g_ids, g_txt, g_emb, g_meta = (list(x) for x in zip(*rows))
+            if embeddings is None:
+                g_emb = self._embed(g_txt)
 
-        ids, texts, embeddings = self._filter_new(ids, texts, embeddings)
-        if ids:
-            self.collection.add(ids=ids, documents=texts, embeddings=embeddings)
+            if dedup_threshold is not None:
+                canon = self._near_duplicates(col, g_ids, g_emb, dedup_threshold)
+                if dedup_mode == "skip":
+                    keep = [j for j, c in enumerate(canon) if c is None]
+                    g_ids, g_txt, g_emb, g_meta = (
+                        [x[j] for j in keep] for x in (g_ids, g_txt, g_emb, g_meta)
+                    )
+                else:
+                    g_meta = [{**m, "dup_of": c or ""} for m, c in zip(g_meta, canon)]
+
+            if g_ids:
+                metas = g_meta if any(g_meta) else None
+                col.add(ids=g_ids, documents=g_txt, embeddings=g_emb, metadatas=metas)
 
     # ── Consulta semántica ─────────────────────────────────────────
-    def query(self, query_text: str, k: int = 30):
-        try:
-            q_emb = titan_embed([query_text])
-        except Exception:
-            q_emb = self.embedder.encode([query_text], device="cpu").tolist()
-
-        res = self.collection.query(query_embeddings=q_emb, n_results=k)
-        return res["documents"][0]
+    def query(self, query_text: str, k: int = 30, start=None, end=None,
+              mmr_lambda: float | None = None, fetch_k: int | None = None,
+              with_ids: bool = False):
+        """
+        Top-k documentos. Con particiones, `start`/`end` (datetime) limitan
+        las colecciones consultadas, se aplican como filtro `where` sobre
+        `ts` en las particiones de los bordes (las interiores caen enteras en
+        el rango) y los resultados se mezclan por distancia. Sin particiones los
+        documentos no llevan `ts` y el rango se ignora.
+        mmr_lambda → recupera `fetch_k` (default 3·k) candidatos y re-rankea
+        con Maximal Marginal Relevance para devolver k documentos diversos.
+        with_ids=True → lista de (doc_id, documento) en vez de sólo documentos.
+        """
+        q_emb = self._embed([query_text])
+        n_fetch = k if mmr_lambda is None else (fetch_k or 3 * k)
+        include = ["documents", "metadatas", "distances"]
+        if mmr_lambda is not None:
+            include.append("embeddings")
+
+        # el rango va como filtro `where` de la consulta (no después del top-k),
+        # así las particiones de los bordes también aportan k candidatos
+        where = None
+        if self.partition:
+            conds = []
+            if start is not None:
+                conds.append({"ts": {"$gte": int(_utc_naive(start).timestamp())}})
+            if end is not None:
+                conds.append({"ts": {"$lte": int(_utc_naive(end).timestamp())}})
+            where = {"$and": conds} if len(conds) > 1 else (conds[0] if conds else None)
+
+        lo = _utc_naive(start) if start is not None else None
+        hi = _utc_naive(end) if end is not None else None
+        hits = []
+        for name in self._overlapping(start, end):
+            col = self._collection(name)
+            p_start, p_end = self._partition_range(name) if self.partition else (None, None)
+            # sólo las particiones de los bordes necesitan el filtro (y contar con get)
+            edge = where is not None and ((lo is not None and p_start < lo) or
+                                          (hi is not None and p_end > hi))
+            n_match = len(col.get(where=where, include=[])["ids"]) if edge else col.count()
+            n = min(n_fetch, n_match)
+            if n == 0:
+                continue
+            kwargs = {"where": where} if edge else {}
+            res = col.query(query_embeddings=q_emb, n_results=n, include=include, **kwargs)
+            embs = res["embeddings"][0] if mmr_lambda is not None else [None] * n
+            for i, doc, dist, emb in zip(res["ids"][0], res["documents"][0],
+                                         res["distances"][0], embs):
+                hits.append((dist, i, doc, emb))
+        hits.sort(key=lambda h: h[0])
+        hits = hits[:n_fetch]
+
+        if mmr_lambda is None:
+            order = range(min(k, len(hits)))
+        else:
+            order = mmr(q_emb[0], [h[3] for h in hits], k, mmr_lambda)
+        return [(hits[j][1], hits[j][2]) if with_ids else hits[j][2] for j in order]
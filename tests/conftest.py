@@ -0,0 +1,45 @@
+import io
+import sys
+from pathlib import Path
+
+import pytest
+from botocore.exceptions import ClientError
+
+# Los módulos del Lambda se importan como en el ZIP (tools/build_lambda.py):
+# lambda/* y los compartidos de src/ como módulos de primer nivel.
+ROOT = Path(__file__).resolve().parents[1]
+for p in (ROOT / "lambda", ROOT / "src"):
+    if str(p) not in sys.path:
+        sys.path.append(str(p))
+
+
+class FakeS3:
+    """get_object / put_object en memoria, con ETag y PUT condicional."""
+
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self):
+        self.objects: dict[tuple[str, str], tuple[bytes, str]] = {}
+        self.puts = 0
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise self.exceptions.NoSuchKey(Key)
+        body, etag = self.objects[(Bucket, Key)]
+        return {"Body": io.BytesIO(body), "ETag": etag}
+
+    def put_object(self, Bucket, Key, Body, IfMatch=None, IfNoneMatch=None, **_):
+        cur = self.objects.get((Bucket, Key))
+        if (IfNoneMatch == "*" and cur) or (IfMatch and (not cur or cur[1] != IfMatch)):
+            raise ClientError({"Error": {"Code": "PreconditionFailed"}}, "PutObject")
+        self.puts += 1
+        etag = f'"{self.puts}"'
+        self.objects[(Bucket, Key)] = (Body, etag)
+        return {"ETag": etag}
+
+
+@pytest.fixture
+def fake_s3():
+    return FakeS3()
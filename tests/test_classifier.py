@@ -0,0 +1,61 @@
+import classifier
+from classifier import classify_batch, parse_batch
+
+
+def test_parse_batch_strict_and_malformed():
+    raw = 'Claro: [{"id": 1, "sentiment": "positive"}, {"id": 2, "sentiment": "Negative"}]'
+    assert parse_batch(raw, 2) == {1: "positive", 2: "negative"}
+
+    # truncado a media respuesta: se rescatan los pares legibles
+    raw = '[{"id": 1, "sentiment": "neutral"}, {"id": "2", "sentiment": "positive"}, {"id": 3, "sent'
+    assert parse_batch(raw, 3) == {1: "neutral", 2: "positive"}
+
+    # ids fuera de rango, etiquetas inválidas y repetidos (gana el primero)
+    raw = ('[{"id": 0, "sentiment": "positive"}, {"id": 4, "sentiment": "neutral"}, '
+           '{"id": 1, "sentiment": "bullish"}, {"id": 2, "sentiment": "negative"}, '
+           '{"id": 2, "sentiment": "positive"}]')
+    assert parse_batch(raw, 3) == {2: "negative"}
+
+    assert parse_batch("no puedo ayudar con eso", 3) == {}
+    assert parse_batch('[{"id": 1}]', 1) == {}
+
+
+def test_classify_batch_requeries_missing_ids(monkeypatch):
+    texts = [f"tweet {i}" for i in range(5)]
+    calls = []
+
+    def fake_chunk(chunk):
+        calls.append(list(chunk))
+        if len(calls) == 1:                     # primera ronda: falta el id 3
+            return {i: "positive" for i in range(1, len(chunk) + 1) if i != 3}
+        return {}                               # la re-consulta tampoco lo trae
+
+    monkeypatch.setattr(classifier, "_classify_chunk", fake_chunk)
+    monkeypatch.setattr(classifier, "bedrock_sentiment",
+                        lambda t: "neutral" if t == "tweet 2" else "??")
+    seen = {}
+    labels, errors = classify_batch(texts, batch_size=5, max_rounds=2, on_labels=seen.update)
+
+    assert calls == [texts, ["tweet 2"]]
+    assert labels == ["positive", "positive", "neutral", "positive", "positive"]
+    assert errors == []
+    assert seen == dict(enumerate(labels))
+
+
+def test_classify_batch_reports_failures_without_aborting(monkeypatch):
+    def fake_chunk(chunk):
+        if "malo" in chunk:
+            raise RuntimeError("ThrottlingException")
+        return {i: "negative" for i in range(1, len(chunk) + 1)}
+
+    def fake_single(text):
+        if text == "malo":
+            raise RuntimeError("ThrottlingException")
+        return "negative"
+
+    monkeypatch.setattr(classifier, "_classify_chunk", fake_chunk)
+    monkeypatch.setattr(classifier, "bedrock_sentiment", fake_single)
+    labels, errors = classify_batch(["a", "b", "malo", "c"], batch_size=2, max_rounds=1)
+
+    assert labels == ["negative", "negative", None, "negative"]
+    assert errors == [(2, "RuntimeError: ThrottlingException")]
@@ -0,0 +1,44 @@
+import datetime as dt
+from types import SimpleNamespace
+
+import dedup_index
+from dedup_index import DedupIndex, index_key
+
+UTC = dt.timezone.utc
+
+
+def _tw(tweet_id: int, day: int, hour: int = 12, tz=UTC):
+    return SimpleNamespace(id=tweet_id, created_at=dt.datetime(2025, 5, day, hour, tzinfo=tz))
+
+
+def test_filter_new_and_commit(fake_s3, monkeypatch):
+    monkeypatch.setattr(dedup_index, "get_client", lambda *a, **k: fake_s3)
+    idx = DedupIndex("bkt")
+
+    batch = [_tw(3, 1), _tw(1, 1), _tw(3, 1), _tw(7, 2)]
+    new = idx.filter_new(batch)
+    assert [tw.id for tw in new] == [3, 1, 7]        # repetido dentro del lote
+    idx.commit(new)
+
+    # otra ejecución (índice recién leído de S3) ya no los vuelve a aceptar
+    later = DedupIndex("bkt")
+    assert [tw.id for tw in later.filter_new([_tw(1, 1), _tw(7, 2), _tw(9, 2)])] == [9]
+    # 01:00 en UTC+2 es el día anterior en UTC: se busca en la partición del 1
+    assert later.filter_new([_tw(3, 2, hour=1, tz=dt.timezone(dt.timedelta(hours=2)))]) == []
+
+    body = fake_s3.get_object(Bucket="bkt", Key=index_key(dt.date(2025, 5, 1)))["Body"].read()
+    assert len(body) == 2 * 8                         # int64 ordenados, sin duplicados
+
+
+def test_commit_merges_concurrent_writer(fake_s3, monkeypatch):
+    monkeypatch.setattr(dedup_index, "get_client", lambda *a, **k: fake_s3)
+    a, b = DedupIndex("bkt"), DedupIndex("bkt")
+    assert a.filter_new([_tw(1, 1)]) and b.filter_new([_tw(2, 1)])   # ambos leen el índice vacío
+
+    a.commit([_tw(1, 1)])
+    b.commit([_tw(2, 1)])                            # If-None-Match falla → relee y une
+
+    fresh = DedupIndex("bkt")
+    seen = fresh.seen(dt.date(2025, 5, 1))
+    assert list(seen.ids) == [1, 2]
+    assert fake_s3.puts == 2
@@ -0,0 +1,45 @@
+import numpy as np
+
+from src.quantization import QuantizedCollection
+
+
+def test_incremental_adds_refit_range(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(201, 64)).astype(np.float32)
+    ids = [str(i) for i in range(len(X))]
+
+    col = QuantizedCollection(tmp_path / "q", rerank_factor=4)
+    col.add(ids[:1], ids[:1], X[:1])              # lote de un documento: lo == hi
+    col.add(ids[1:], ids[1:], X[1:])              # fuera de ese rango → se re-ajusta
+
+    saturated = np.mean(np.abs(col.codes.astype(int)) >= 127)
+    assert saturated < 0.05
+
+    res = col.query(X[:50], n_results=1, include=["distances"])
+    assert [hits[0] for hits in res["ids"]] == ids[:50]
+
+    # los códigos y parámetros persistidos coinciden con los de memoria
+    reloaded = QuantizedCollection(tmp_path / "q")
+    np.testing.assert_array_equal(reloaded.codes, col.codes)
+    assert reloaded.count() == len(X)
+
+
+def test_documents_and_filters_read_from_disk(tmp_path):
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(40, 16)).astype(np.float32)
+    ids = [str(i) for i in range(len(X))]
+
+    col = QuantizedCollection(tmp_path / "q")
+    col.add(ids[:20], [f"doc {i}" for i in ids[:20]], X[:20], [{"ts": i} for i in range(20)])
+    col.add(ids[20:], [f"doc {i}" for i in ids[20:]], X[20:])      # sin metadatos
+
+    reloaded = QuantizedCollection(tmp_path / "q")
+    assert not hasattr(reloaded, "documents")
+    where = {"$and": [{"ts": {"$gte": 5}}, {"ts": {"$lte": 9}}]}
+    assert reloaded.get(where=where, include=[])["ids"] == ids[5:10]
+
+    res = reloaded.query(X[7:8], n_results=3, where=where)
+    assert res["ids"][0][0] == "7"
+    assert res["documents"][0][0] == "doc 7"
+    assert res["metadatas"][0][0] == {"ts": 7}
+    assert reloaded.get(ids=["30"])["documents"] == ["doc 30"]
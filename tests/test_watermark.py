@@ -0,0 +1,81 @@
+import json
+
+import watermark
+from watermark import WatermarkStore, floor_id
+
+NOW = 1_760_000_000
+BASE = floor_id(NOW) + (1 << 32)              # ids dentro de la ventana de 7 días
+
+
+def _id(k: int) -> str:
+    return str(BASE + k)
+
+
+def test_gap_open_drain_close(tmp_path):
+    path = tmp_path / "wm.json"
+    marks = WatermarkStore(path=path)
+    newest, = marks.windows("q", NOW)
+    assert newest == {"since_id": None, "until_id": None}
+
+    # primera ejecución: llega al tope con páginas pendientes → hueco hasta lo más viejo traído
+    marks.record("q", [(newest, [_id(300), _id(200)], True)], NOW)
+    marks.save()
+    marks = WatermarkStore(path=path)
+    newest, gap = marks.windows("q", NOW)
+    assert newest == {"since_id": _id(300), "until_id": None}
+    assert gap == {"since_id": None, "until_id": _id(200)}
+
+    # lo nuevo se busca primero; el hueco drena parcialmente y se acorta
+    marks.record("q", [(newest, [_id(400)], False), (gap, [_id(150), _id(100)], True)], NOW)
+    newest, gap = marks.windows("q", NOW)
+    assert newest == {"since_id": _id(400), "until_id": None}
+    assert gap == {"since_id": None, "until_id": _id(100)}
+
+    # un hueco cuya búsqueda no trae nada también se cierra
+    marks.record("q", [(newest, [], False), (gap, [], False)], NOW)
+    assert marks.windows("q", NOW) == [{"since_id": _id(400), "until_id": None}]
+
+
+def test_unsearched_gap_is_kept(tmp_path):
+    marks = WatermarkStore(path=tmp_path / "wm.json")
+    newest, = marks.windows("q", NOW)
+    marks.record("q", [(newest, [_id(50)], True)], NOW)
+    newest, gap = marks.windows("q", NOW)
+
+    # el tope se agotó en la ventana nueva: el hueco anterior sigue pendiente
+    marks.record("q", [(newest, [_id(90), _id(60)], True)], NOW)
+    assert marks.windows("q", NOW)[1:] == [
+        {"since_id": _id(50), "until_id": _id(60)},
+        gap,
+    ]
+
+
+def test_stale_ids_are_clamped_to_search_window(tmp_path):
+    path = tmp_path / "wm.json"
+    old = str(floor_id(NOW) - 1)
+    path.write_text(json.dumps({
+        "quiet": {"since_id": old, "gaps": []},
+        "legacy": old,                                         # formato {query: newest_id}
+        "q": {"since_id": _id(10), "gaps": [[None, _id(5)], [None, old]]},
+    }))
+    marks = WatermarkStore(path=path)
+
+    assert marks.windows("quiet", NOW) == [{"since_id": None, "until_id": None}]
+    assert marks.windows("legacy", NOW) == [{"since_id": None, "until_id": None}]
+    assert marks.windows("q", NOW)[1:] == [{"since_id": None, "until_id": _id(5)}]
+
+
+def test_concurrent_save_merges_and_never_regresses(fake_s3, monkeypatch):
+    monkeypatch.setattr(watermark, "get_client", lambda *a, **k: fake_s3)
+    a, b = WatermarkStore("bkt"), WatermarkStore("bkt")
+
+    a.record("q1", [(a.windows("q1", NOW)[0], [_id(20)], False)], NOW)
+    a.save()
+    # b leyó antes que a escribiera: avanza otra query y una versión vieja de q1
+    b.record("q1", [(b.windows("q1", NOW)[0], [_id(10)], False)], NOW)
+    b.record("q2", [(b.windows("q2", NOW)[0], [_id(30)], False)], NOW)
+    b.save()
+
+    stored = json.loads(fake_s3.get_object(Bucket="bkt", Key=watermark.WATERMARK_KEY)["Body"].read())
+    assert stored["q1"]["since_id"] == _id(20)
+    assert stored["q2"]["since_id"] == _id(30)
@@ -0,0 +1,233 @@
+"""
+Backfill de sentimiento con Bedrock batch inference.
+
+Tres pasos (desde la raíz del repo):
+
+  1) prepare: Parquets → JSONL en formato batch de Bedrock
+     python -m tools.batch_backfill prepare s3://BUCKET/tweets/entity=BBVA/year=2025/month=05/ \\
+         --out s3://BUCKET/batch/input/2025-05.jsonl
+
+  2) submit: lanza el job (o lo ejecuta localmente con --local)
+     python -m tools.batch_backfill submit s3://BUCKET/batch/input/2025-05.jsonl \\
+         --output s3://BUCKET/batch/output/ --role-arn arn:aws:iam::…:role/BedrockBatch --wait
+     python -m tools.batch_backfill submit batch.jsonl --output out/ --local
+
+  3) join: une las etiquetas de vuelta a los Parquet por tweet_id
+     python -m tools.batch_backfill join s3://BUCKET/tweets/entity=BBVA/year=2025/month=05/ \\
+         s3://BUCKET/batch/output/<job-id>/2025-05.jsonl.out
+
+El prefijo puede acotarse hasta la partición horaria (…/day=DD/hour=HH/) o
+abarcar todas las entidades (s3://BUCKET/tweets/). `join` no sobrescribe: cada
+Parquet con etiquetas nuevas se escribe con otra key (`batch_….bf<stamp>.parquet`)
+y se borra el original, de modo que el agente —que salta las keys de
+`ingested_keys`— lo vuelve a leer y actualiza el sentimiento de las filas que
+ya tenía indexadas.
+
+Bedrock exige un mínimo de registros por job (1000 al escribir esto); para
+lotes pequeños usar --local, que reutiliza invoke_model (o el stub local).
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import s3fs
+
+from src.aws_clients import get_client
+from src.model_routing import CLASSIFY_PROMPT, anthropic_body, route
+from src.parquet_writer import to_parquet_bytes, to_table
+
+LABELS = ("positive", "neutral", "negative")
+fs = s3fs.S3FileSystem()
+
+
+# ── IO local / S3 ─────────────────────────────────────────────────
+def _is_s3(uri: str) -> bool:
+    return uri.startswith("s3://")
+
+
+def _open(uri: str, mode: str = "r"):
+    return fs.open(uri, mode) if _is_s3(uri) else open(uri, mode, encoding="utf-8")
+
+
+def parquet_files(root: str) -> list[str]:
+    if _is_s3(root):
+        return ["s3://" + f for f in fs.glob(f"{root.rstrip('/')}/**/*.parquet")]
+    return [str(p) for p in sorted(Path(root).rglob("*.parquet"))]
+
+
+def _read_table(uri: str) -> pa.Table:
+    with (fs.open(uri, "rb") if _is_s3(uri) else open(uri, "rb")) as f:
+        return pq.read_table(f)
+
+
+def _read(uri: str) -> pd.DataFrame:
+    return _read_table(uri).to_pandas()
+
+
+def _write(table: pa.Table, uri: str):
+    """Escribe con el esquema fijado y los metadatos created_at_min/max del Lambda."""
+    with (fs.open(uri, "wb") if _is_s3(uri) else open(uri, "wb")) as f:
+        f.write(to_parquet_bytes(table))
+
+
+def _remove(uri: str):
+    fs.rm(uri) if _is_s3(uri) else Path(uri).unlink()
+
+
+def backfilled_uri(uri: str, stamp: str) -> str:
+    """batch_X.parquet (o batch_X.bfA.parquet) → batch_X.bf<stamp>.parquet."""
+    stem = uri[: -len(".parquet")].split(".bf")[0]
+    return f"{stem}.bf{stamp}.parquet"
+
+
+# ── 1) prepare ────────────────────────────────────────────────────
+def prepare(root: str, out: str, relabel_all: bool = False) -> int:
+    cfg = route("classify")
+    seen, n = set(), 0
+    with _open(out, "w") as f:
+        for uri in parquet_files(root):
+            df = _read(uri)
+            if "is_futbol" in df:
+                df = df[df["is_futbol"] != True]
+            if not relabel_all and "sentiment" in df:
+                df = df[df["sentiment"].isna()]
+            for tid, text in zip(df["tweet_id"], df["text"]):
+                if tid in seen:
+                    continue
+                seen.add(tid)
+                prompt = CLASSIFY_PROMPT.format(text=str(text).replace("\n", " "))
+                body = anthropic_body(prompt, cfg["max_tokens"], cfg["temperature"])
+                f.write(json.dumps({"recordId": str(tid), "modelInput": body},
+                                   ensure_ascii=False) + "\n")
+                n += 1
+    print(f"{n} registros → {out}")
+    return n
+
+
+# ── 2) submit ─────────────────────────────────────────────────────
+def submit(input_uri: str, output_uri: str, role_arn: str | None, wait: bool) -> str:
+    bedrock = get_client("bedrock")
+    job = bedrock.create_model_invocation_job(
+        jobName=f"sentiment-backfill-{int(time.time())}",
+        roleArn=role_arn,
+        modelId=route("classify")["model_id"],
+        inputDataConfig={"s3InputDataConfig": {"s3Uri": input_uri}},
+        outputDataConfig={"s3OutputDataConfig": {"s3Uri": output_uri}},
+    )
+    arn = job["jobArn"]
+    print(f"Job enviado: {arn}")
+    while wait:
+        status = bedrock.get_model_invocation_job(jobIdentifier=arn)["status"]
+        print(f"  estado: {status}")
+        if status in ("Completed", "PartiallyCompleted", "Failed", "Stopped", "Expired"):
+            break
+        time.sleep(60)
+    return arn
+
+
+def submit_local(input_uri: str, output_dir: str) -> str:
+    """Stand-in del job: invoca registro a registro y escribe `<input>.out` como Bedrock."""
+    runtime = get_client("bedrock-runtime")
+    model_id = route("classify")["model_id"]
+    out_uri = f"{output_dir.rstrip('/')}/{Path(input_uri).name}.out"
+    if not _is_s3(out_uri):
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+    with _open(input_uri) as src, _open(out_uri, "w") as dst:
+        for line in src:
+            rec = json.loads(line)
+            out = {"recordId": rec["recordId"], "modelInput": rec["modelInput"]}
+            try:
+                resp = runtime.invoke_model(modelId=model_id, body=json.dumps(rec["modelInput"]),
+                                            contentType="application/json",
+                                            accept="application/json")
+                out["modelOutput"] = json.loads(resp["body"].read())
+            except Exception as e:
+                out["error"] = {"errorMessage": str(e)}
+            dst.write(json.dumps(out, ensure_ascii=False) + "\n")
+    print(f"Salida local → {out_uri}")
+    return out_uri
+
+
+# ── 3) join ──────────────────────────────────────────────────────
+def parse_label(record: dict) -> str | None:
+    try:
+        words = record["modelOutput"]["content"][0]["text"].strip().split()
+    except (KeyError, IndexError, TypeError):
+        return None
+    label = words[0].lower().strip(".'\"") if words else None
+    return label if label in LABELS else None
+
+
+def join(root: str, output_uri: str) -> int:
+    labels = {}
+    with _open(output_uri) as f:
+        for line in f:
+            rec = json.loads(line)
+            label = parse_label(rec)
+            if label:
+                labels[rec["recordId"]] = label
+
+    # En Arrow y no en pandas: `sentiment` es dictionary y llega a pandas como
+    # Categorical con sólo las categorías observadas (vacío si todo es nulo).
+    stamp, updated = time.strftime("%Y%m%dT%H%M%S", time.gmtime()), 0
+    for uri in parquet_files(root):
+        rows = _read_table(uri).to_pylist()
+        hits = 0
+        for r in rows:
+            label = labels.get(str(r["tweet_id"]))
+            if label:
+                r["sentiment"], r["error"] = label, None
+                hits += 1
+        if not hits:
+            continue
+        # key nueva: una key ya listada en ingested_keys no se vuelve a leer
+        dest = backfilled_uri(uri, stamp)
+        _write(to_table(rows), dest)
+        if dest != uri:
+            _remove(uri)
+        updated += hits
+    print(f"{len(labels)} etiquetas válidas, {updated} filas actualizadas")
+    return updated
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("prepare")
+    p.add_argument("root")
+    p.add_argument("--out", required=True)
+    p.add_argument("--relabel-all", action="store_true",
+                   help="incluye filas que ya tienen sentiment")
+
+    s = sub.add_parser("submit")
+    s.add_argument("input")
+    s.add_argument("--output", required=True)
+    s.add_argument("--role-arn")
+    s.add_argument("--wait", action="store_true")
+    s.add_argument("--local", action="store_true")
+
+    j = sub.add_parser("join")
+    j.add_argument("root")
+    j.add_argument("output")
+
+    args = ap.parse_args()
+    if args.cmd == "prepare":
+        prepare(args.root, args.out, args.relabel_all)
+    elif args.cmd == "submit":
+        if args.local:
+            submit_local(args.input, args.output)
+        else:
+            if not args.role_arn:
+                ap.error("--role-arn es obligatorio para el job de Bedrock")
+            submit(args.input, args.output, args.role_arn, args.wait)
+    else:
+        join(args.root, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Servidor local que imita `bedrock-runtime` (InvokeModel e
+InvokeModelWithResponseStream) para pruebas offline y benchmarks de carga.
+
+Uso (desde la raíz del repo):
+    python -m tools.bedrock_stub --port 8787 --latency lognormal:80,0.5 --throttle-rate 0.05
+
+    export AWS_ENDPOINT_URL_BEDROCK_RUNTIME=http://127.0.0.1:8787
+    export AWS_ACCESS_KEY_ID=test AWS_SECRET_ACCESS_KEY=test   # la firma no se valida
+
+Respuestas deterministas:
+  • Titan embed → vector pseudoaleatorio sembrado con sha256(texto), normalizado.
+  • Claude      → si el prompt pide clasificar sentimiento, etiqueta por reglas
+                  léxicas (array JSON para el prompt por lotes); en otro caso un
+                  eco corto con el tamaño del contexto.
+
+Latencia inyectable: fixed:MS · uniform:MIN,MAX · lognormal:MEDIANA_MS,SIGMA.
+--throttle-rate p devuelve ThrottlingException (HTTP 429) con probabilidad p.
+GET /stats devuelve los contadores de peticiones.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+POSITIVE = {"sube", "suben", "gana", "ganancias", "récord", "record", "mejora", "crece",
+            "positivo", "excelente", "beneficio", "rally", "gains", "beats", "up", "strong",
+            "growth", "profit", "bueno", "buena", "gracias"}
+NEGATIVE = {"cae", "caen", "pierde", "pérdidas", "perdidas", "baja", "crisis", "fraude",
+            "error", "falla", "fallando", "no funciona", "no puedo", "peor", "multa",
+            "down", "loss", "falls", "weak", "lawsuit", "robo", "pésimo", "pesimo"}
+
+
+# ── Respuestas deterministas ──────────────────────────────────────
+def hash_embedding(text: str, dim: int) -> list[float]:
+    rng = random.Random(hashlib.sha256(text.encode()).digest())
+    v = [rng.gauss(0, 1) for _ in range(dim)]
+    norm = math.sqrt(sum(x * x for x in v)) or 1.0
+    return [x / norm for x in v]
+
+
+def rule_sentiment(text: str) -> str:
+    t = text.lower()
+    score = sum(w in t for w in POSITIVE) - sum(w in t for w in NEGATIVE)
+    return "positive" if score > 0 else "negative" if score < 0 else "neutral"
+
+
+def _prompt_text(body: dict) -> str:
+    parts = []
+    for msg in body.get("messages", []):
+        content = msg.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(c.get("text", "") for c in content or [])
+    return "\n".join(parts)
+
+
+def claude_reply(body: dict) -> str:
+    prompt = _prompt_text(body)
+    if "sentimiento" in prompt.lower():
+        batch = re.findall(r"^(\d+)\. «(.*)»$", prompt, re.MULTILINE)
+        if batch:
+            return json.dumps([{"id": int(i), "sentiment": rule_sentiment(t)} for i, t in batch])
+    m = re.search(r"Tweet: «(.*)»", prompt, re.DOTALL)
+    if "sentimiento" in prompt.lower() and m:
+        return rule_sentiment(m.group(1))
+    return f"Respuesta simulada: {len(prompt.split())} palabras de contexto."
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+# ── Codificación application/vnd.amazon.eventstream ──────────────
+def _header(name: str, value: str) -> bytes:
+    n, v = name.encode(), value.encode()
+    return struct.pack("!B", len(n)) + n + b"\x07" + struct.pack("!H", len(v)) + v
+
+
+def encode_event(payload: dict) -> bytes:
+    headers = (_header(":event-type", "chunk")
+               + _header(":content-type", "application/json")
+               + _header(":message-type", "event"))
+    body = json.dumps({"bytes": base64.b64encode(json.dumps(payload).encode()).decode()}).encode()
+    total = 12 + len(headers) + len(body) + 4
+    prelude = struct.pack("!II", total, len(headers))
+    msg = prelude + struct.pack("!I", zlib.crc32(prelude)) + headers + body
+    return msg + struct.pack("!I", zlib.crc32(msg))
+
+
+# ── Latencia / throttling ─────────────────────────────────────────
+def parse_latency(spec: str):
+    kind, _, args = spec.partition(":")
+    vals = [float(x) for x in args.split(",")] if args else []
+    if kind == "fixed":
+        return lambda: vals[0] / 1000
+    if kind == "uniform":
+        return lambda: random.uniform(vals[0], vals[1]) / 1000
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(math.log(vals[0]), vals[1]) / 1000
+    raise ValueError(f"Latencia desconocida: {spec}")
+
+
+class StubState:
+    def __init__(self, latency, throttle_rate: float, dim: int):
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.dim = dim
+        self.lock = threading.Lock()
+        self.counts = {"invoke": 0, "stream": 0, "throttled": 0}
+
+    def bump(self, key: str):
+        with self.lock:
+            self.counts[key] += 1
+
+
+# ── Handler HTTP ──────────────────────────────────────────────────
+class BedrockHandler(BaseHTTPRequestHandler):
+    state: StubState
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, extra: dict | None = None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (extra or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, self.state.counts)
+        else:
+            self._send_json(404, {"message": "not found"})
+
+    def do_POST(self):
+        m = re.match(r"^/model/(.+)/(invoke|invoke-with-response-stream)$", self.path)
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not m:
+            return self._send_json(404, {"message": "not found"})
+        model_id, op = unquote(m.group(1)), m.group(2)
+
+        time.sleep(self.state.latency())
+        if random.random() < self.state.throttle_rate:
+            self.state.bump("throttled")
+            return self._send_json(
+                429, {"message": "Too many requests, please wait before trying again."},
+                {"x-amzn-ErrorType": "ThrottlingException"},
+            )
+
+        if op == "invoke":
+            self.state.bump("invoke")
+            return self._send_json(200, self._invoke(model_id, body))
+        self.state.bump("stream")
+        self._stream(model_id, body)
+
+    def _invoke(self, model_id: str, body: dict) -> dict:
+        if model_id.startswith("amazon.titan-embed"):
+            text = body.get("inputText", "")
+            return {"embedding": hash_embedding(text, self.state.dim),
+                    "inputTextTokenCount": _tokens(text)}
+        text = claude_reply(body)
+        return {
+            "id": "msg_stub", "type": "message", "role": "assistant", "model": model_id,
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": _tokens(_prompt_text(body)), "output_tokens": _tokens(text)},
+        }
+
+    def _stream(self, model_id: str, body: dict):
+        t0 = time.perf_counter()
+        text = claude_reply(body)
+        in_tok, out_tok = _tokens(_prompt_text(body)), _tokens(text)
+        words = re.findall(r"\S+\s*", text)
+        events = [{"type": "message_start", "message": {
+                      "id": "msg_stub", "type": "message", "role": "assistant", "model": model_id,
+                      "content": [], "usage": {"input_tokens": in_tok, "output_tokens": 0}}},
+                  {"type": "content_block_start", "index": 0,
+                   "content_block": {"type": "text", "text": ""}}]
+        events += [{"type": "content_block_delta", "index": 0,
+                    "delta": {"type": "text_delta", "text": w}} for w in words]
+        events += [{"type": "content_block_stop", "index": 0},
+                   {"type": "message_delta", "delta": {"stop_reason": "end_turn"},
+                    "usage": {"output_tokens": out_tok}}]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.amazon.eventstream")
+        self.send_header("X-Amzn-Bedrock-Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for ev in events:
+            self._chunk(encode_event(ev))
+        latency_ms = int((time.perf_counter() - t0) * 1000)
+        self._chunk(encode_event({"type": "message_stop", "amazon-bedrock-invocationMetrics": {
+            "inputTokenCount": in_tok, "outputTokenCount": out_tok,
+            "invocationLatency": latency_ms, "firstByteLatency": latency_ms}}))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def serve(host: str = "127.0.0.1", port: int = 8787, latency: str = "fixed:0",
+          throttle_rate: float = 0.0, dim: int = 1536) -> ThreadingHTTPServer:
+    """Crea el servidor (sin arrancarlo); útil para levantarlo en un hilo desde tests."""
+    handler = type("Handler", (BedrockHandler,), {
+        "state": StubState(parse_latency(latency), throttle_rate, dim)
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8787)
+    ap.add_argument("--latency", default="fixed:0")
+    ap.add_argument("--throttle-rate", type=float, default=0.0)
+    ap.add_argument("--dim", type=int, default=1536)
+    args = ap.parse_args()
+    server = serve(args.host, args.port, args.latency, args.throttle_rate, args.dim)
+    print(f"Bedrock stub en http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
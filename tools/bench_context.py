@@ -0,0 +1,65 @@
+"""
+Compara el contexto RAG crudo (top-k unidos) con el empaquetado por presupuesto.
+
+Uso (desde la raíz del repo):
+    python -m tools.bench_context --parquet data/tweets_fin_2024.parquet
+    python -m tools.bench_context --bedrock        # además mide tokens reales y latencia
+
+Sin --bedrock sólo cuenta tokens aproximados; con --bedrock invoca Claude
+para ambos prompts y reporta inputTokenCount y tiempo total por respuesta.
+"""
+import argparse
+import statistics
+
+from src.agent import FinancialTweetAgent
+from src.bedrock_client import claude_chat_stream
+from src.context_builder import approx_tokens
+
+QUESTIONS = [
+    "¿Qué opina el mercado sobre los resultados trimestrales de los bancos?",
+    "¿Qué se dice de la Reserva Federal y las tasas de interés?",
+    "¿Cómo se percibe el precio del petróleo esta semana?",
+    "¿Hay noticias sobre fusiones y adquisiciones?",
+    "¿Qué comentan sobre el dólar?",
+]
+
+
+def _run(prompt: str) -> dict:
+    stats: dict = {}
+    # sin caché: un acierto no trae input_tokens ni latencia real
+    for _ in claude_chat_stream(prompt, temp=0, stats=stats, use_cache=False):
+        pass
+    return stats
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--parquet", default="data/tweets_fin_2024.parquet")
+    ap.add_argument("--k", type=int, default=30)
+    ap.add_argument("--bedrock", action="store_true")
+    args = ap.parse_args()
+
+    agent = FinancialTweetAgent()
+    agent.ingest(args.parquet)
+
+    rows = []
+    for q in QUESTIONS:
+        raw_docs = agent.db.query(q, args.k)
+        raw_prompt = f"Contexto:\n{chr(10).join(raw_docs)}\n\nPregunta: {q}"
+        packed_prompt = agent._rag_prompt(q, args.k, None, None, 0.5)
+        row = {"raw_tok": approx_tokens(raw_prompt), "packed_tok": approx_tokens(packed_prompt)}
+        if args.bedrock:
+            raw, packed = _run(raw_prompt), _run(packed_prompt)
+            row.update(raw_in=raw["input_tokens"], packed_in=packed["input_tokens"],
+                       raw_s=raw["total_s"], packed_s=packed["total_s"])
+        rows.append(row)
+        print(q[:50].ljust(52), "  ".join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}"
+                                          for k, v in row.items()))
+
+    print("\nmedianas:")
+    for key in rows[0]:
+        print(f"  {key}: {statistics.median(r[key] for r in rows):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Harness recall/latencia para parámetros HNSW de Chroma.
+
+Uso (desde la raíz del repo):
+    python -m tools.bench_hnsw                              # corpus de ejemplo
+    python -m tools.bench_hnsw --synthetic 200000 --dim 384 # set sintético escalado
+    python -m tools.bench_hnsw --m 16 32 --ef-construction 100 200 --ef-search 50 100
+
+Por cada combinación (M, ef_construction, ef_search) construye la colección
+desde cero y mide tiempo de build, tamaño del índice en disco, p50/p99 de
+consulta y recall@k contra la verdad de fuerza bruta.
+"""
+import argparse
+import itertools
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from chromadb import PersistentClient
+
+from src.quantization import _normalize
+from src.vector_db import hnsw_metadata
+from tools.bench_quantization import exact_topk, load_corpus
+
+BATCH = 5_000
+
+
+def synthetic(n: int, dim: int, clusters: int = 64, seed: int = 0) -> np.ndarray:
+    """Vectores agrupados (más realistas que ruido uniforme para HNSW)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    X = centers[rng.integers(0, clusters, n)] + rng.normal(scale=0.5, size=(n, dim))
+    return _normalize(X)
+
+
+def corpus_embeddings(path: str) -> np.ndarray:
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer("all-MiniLM-L6-v2", device="cpu")
+    return _normalize(model.encode(load_corpus(path), batch_size=64, device="cpu"))
+
+
+def dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def run_config(X, Q, truth, k, m, ef_c, ef_s) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        client = PersistentClient(tmp)
+        col = client.create_collection("bench", metadata=hnsw_metadata(m, ef_c, ef_s))
+        ids = [str(i) for i in range(len(X))]
+
+        t0 = time.perf_counter()
+        for i in range(0, len(X), BATCH):
+            col.add(ids=ids[i : i + BATCH], embeddings=X[i : i + BATCH].tolist())
+        build_s = time.perf_counter() - t0
+
+        lat, recalls = [], []
+        for q, gt in zip(Q, truth):
+            t0 = time.perf_counter()
+            res = col.query(query_embeddings=[q.tolist()], n_results=k, include=[])
+            lat.append(time.perf_counter() - t0)
+            got = {int(i) for i in res["ids"][0]}
+            recalls.append(len(got & set(gt.tolist())) / k)
+        size = dir_size(Path(tmp))
+
+    return {
+        "M": m, "ef_c": ef_c, "ef_s": ef_s,
+        "build_s": build_s,
+        "size_mb": size / 1e6,
+        "p50_ms": np.percentile(lat, 50) * 1e3,
+        "p99_ms": np.percentile(lat, 99) * 1e3,
+        f"recall@{k}": float(np.mean(recalls)),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--parquet", default="data/tweets_fin_2024.parquet")
+    ap.add_argument("--synthetic", type=int, default=0, help="n vectores sintéticos (0 = corpus)")
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--k", type=int, default=30)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--m", type=int, nargs="+", default=[8, 16, 32])
+    ap.add_argument("--ef-construction", type=int, nargs="+", default=[100, 200])
+    ap.add_argument("--ef-search", type=int, nargs="+", default=[10, 50, 100])
+    args = ap.parse_args()
+
+    X = synthetic(args.synthetic, args.dim) if args.synthetic else corpus_embeddings(args.parquet)
+    rng = np.random.default_rng(1)
+    q_idx = rng.choice(len(X), size=min(args.queries, len(X)), replace=False)
+    Q = _normalize(X[q_idx] + rng.normal(0, 0.05, size=X[q_idx].shape))
+    truth = exact_topk(X, Q, args.k)
+    print(f"{len(X)} vectores × {X.shape[1]} dims, {len(Q)} consultas, k={args.k}\n")
+
+    rows = []
+    for m, ef_c, ef_s in itertools.product(args.m, args.ef_construction, args.ef_search):
+        r = run_config(X, Q, truth, args.k, m, ef_c, ef_s)
+        rows.append(r)
+        print("  ".join(f"{key}={val:.3f}" if isinstance(val, float) else f"{key}={val}"
+                        for key, val in r.items()))
+
+    best = max(rows, key=lambda r: (r[f"recall@{args.k}"] >= 0.98, -r["p99_ms"]))
+    print(f"\nSugerido: VectorDB(hnsw_m={best['M']}, ef_construction={best['ef_c']}, "
+          f"ef_search={best['ef_s']})")
+
+
+if __name__ == "__main__":
+    main()
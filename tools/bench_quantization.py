@@ -0,0 +1,123 @@
+"""
+Benchmark: índice int8 + re-ranking float32 vs. búsqueda exacta.
+
+Uso (desde la raíz del repo):
+    python -m tools.bench_quantization --parquet data/tweets_fin_2024.parquet
+
+Mide recall@k frente a la búsqueda exacta (fuerza bruta float32), latencia
+por consulta y la memoria residente REAL (RSS del proceso) que suma abrir cada
+índice y responder una consulta, int8 vs. la colección HNSW float32 de Chroma.
+Cada RSS se mide en un proceso nuevo para no contar lo que dejó el anterior.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sentence_transformers import SentenceTransformer
+
+from src.data_pipeline import clean
+from src.quantization import QuantizedCollection, _normalize
+
+
+def load_corpus(path: str) -> list[str]:
+    df = pd.read_parquet(path)
+    col = "clean" if "clean" in df else "text"
+    texts = df[col].astype(str)
+    if col == "text":
+        texts = texts.map(clean)
+    return [t for t in texts.tolist() if t]
+
+
+def exact_topk(X: np.ndarray, Q: np.ndarray, k: int) -> np.ndarray:
+    S = Q @ X.T
+    top = np.argpartition(-S, k - 1, axis=1)[:, :k]
+    return top
+
+
+def _rss_mb() -> float:
+    """RSS actual (Linux: /proc); en otros sistemas, el pico (ru_maxrss)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def _resident_mb(kind: str, path: str, q: np.ndarray) -> float:
+    """MB de RSS que suma abrir el índice `kind` ya persistido en `path` y consultarlo."""
+    from chromadb import PersistentClient        # import fuera de la medición
+    before = _rss_mb()
+    if kind == "int8":
+        col = QuantizedCollection(path)
+        col.query([q], n_results=10)
+    else:
+        col = PersistentClient(path).get_collection("bench")
+        col.query(query_embeddings=[q.tolist()], n_results=10)
+    return _rss_mb() - before
+
+
+def _build_chroma(path: str, ids, texts, X: np.ndarray, batch: int = 5000):
+    from chromadb import PersistentClient
+    col = PersistentClient(path).get_or_create_collection("bench", metadata={"hnsw:space": "cosine"})
+    for i in range(0, len(ids), batch):
+        col.add(ids=ids[i : i + batch], documents=texts[i : i + batch],
+                embeddings=X[i : i + batch].tolist())
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--parquet", default="data/tweets_fin_2024.parquet")
+    ap.add_argument("--k", type=int, default=30)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--rerank-factor", type=int, default=4)
+    args = ap.parse_args()
+
+    texts = load_corpus(args.parquet)
+    model = SentenceTransformer("all-MiniLM-L6-v2", device="cpu")
+    X = _normalize(model.encode(texts, batch_size=64, device="cpu"))
+    rng = np.random.default_rng(0)
+    q_idx = rng.choice(len(texts), size=min(args.queries, len(texts)), replace=False)
+    # Consultas = tweets del corpus con ruido, para que no sean coincidencias exactas
+    Q = _normalize(X[q_idx] + rng.normal(0, 0.05, size=X[q_idx].shape).astype(np.float32))
+
+    truth = exact_topk(X, Q, args.k)
+    ids = [str(i) for i in range(len(texts))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        int8_dir, chroma_dir = os.path.join(tmp, "int8"), os.path.join(tmp, "chroma")
+        col = QuantizedCollection(int8_dir, rerank_factor=args.rerank_factor)
+        col.add(ids, texts, X)
+
+        lat, recalls = [], []
+        for q, gt in zip(Q, truth):
+            t0 = time.perf_counter()
+            res = col.query([q], n_results=args.k, include=())
+            lat.append(time.perf_counter() - t0)
+            got = {int(i) for i in res["ids"][0]}
+            recalls.append(len(got & set(gt.tolist())) / args.k)
+        mem = col.nbytes()
+
+        _build_chroma(chroma_dir, ids, texts, X)
+        with mp.get_context("spawn").Pool(1, maxtasksperchild=1) as pool:
+            rss_int8 = pool.apply(_resident_mb, ("int8", int8_dir, Q[0]))
+        with mp.get_context("spawn").Pool(1, maxtasksperchild=1) as pool:
+            rss_chroma = pool.apply(_resident_mb, ("chroma", chroma_dir, Q[0]))
+
+    n, d = X.shape
+    print(f"corpus: {n} docs × {d} dims  |  consultas: {len(Q)}  |  k={args.k}")
+    print(f"recall@{args.k}: {np.mean(recalls):.4f} (min {np.min(recalls):.4f})")
+    print(f"latencia p50/p99: {np.percentile(lat, 50)*1e3:.2f} / {np.percentile(lat, 99)*1e3:.2f} ms")
+    print(f"arreglos int8 (códigos + offsets/columnas): {mem['resident_int8']/1e6:.2f} + "
+          f"{mem['resident_index']/1e6:.2f} MB")
+    print(f"RSS Chroma float32 (HNSW):  {rss_chroma:8.2f} MB")
+    print(f"RSS int8 (proceso real):    {rss_int8:8.2f} MB "
+          f"(×{rss_chroma/max(rss_int8, 1e-6):.1f} menos que Chroma)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Empaqueta el Lambda de ingesta (`bbvaTweetIngestor`) como ZIP.
+
+Uso (desde la raíz del repo):
+    python -m tools.build_lambda                 # lambda_build/ + bbvaTweetIngestor.zip
+    python -m tools.build_lambda --no-deps       # sólo código (sin pip), p. ej. para probar
+
+Los módulos que el Lambda comparte con la app viven una sola vez en `src/`
+(SHARED); aquí se copian junto a `lambda/*` en la raíz del paquete, donde el
+Lambda los importa como módulos de primer nivel (`from aws_clients import …`).
+Para correrlo sin empaquetar: `cd lambda && PYTHONPATH=../src python lambda_function.py`.
+"""
+import argparse
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SHARED = ("aws_clients", "metrics", "model_routing", "parquet_writer", "rate_limit",
+          "response_cache")
+
+
+def build(out: Path, deps: bool = True) -> Path:
+    shutil.rmtree(out, ignore_errors=True)
+    shutil.copytree(ROOT / "lambda", out,
+                    ignore=shutil.ignore_patterns("__pycache__", "requirements.txt"))
+    for name in SHARED:
+        if (out / f"{name}.py").exists():
+            sys.exit(f"lambda/{name}.py duplica src/{name}.py: bórralo")
+        shutil.copy(ROOT / "src" / f"{name}.py", out / f"{name}.py")
+    if deps:
+        subprocess.run([sys.executable, "-m", "pip", "install", "-q", "-r",
+                        str(ROOT / "lambda" / "requirements.txt"), "-t", str(out)], check=True)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", default="lambda_build")
+    ap.add_argument("--zip", default="bbvaTweetIngestor.zip")
+    ap.add_argument("--no-deps", action="store_true")
+    args = ap.parse_args()
+
+    out = build(ROOT / args.out, deps=not args.no_deps)
+    archive = shutil.make_archive(str(ROOT / Path(args.zip).with_suffix("")), "zip", out)
+    print(f"{archive} ({Path(archive).stat().st_size / 2**20:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compara modelos candidatos para la tarea `classify` (sentimiento de tweets).
+
+Uso (desde la raíz del repo):
+    python -m tools.compare_classifiers --parquet data/tweets_fin_2024.parquet --n 200 \\
+        --models anthropic.claude-3-sonnet-20240229-v1:0 anthropic.claude-3-haiku-20240307-v1:0
+
+Por cada modelo mide latencia p50/p99, tokens de entrada/salida y el acuerdo
+de etiquetas con el primer modelo de la lista (referencia) y, si existe, con
+la columna `sentiment` del Parquet. Usa el mismo prompt que el Lambda.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.aws_clients import get_client
+from src.model_routing import CLASSIFY_PROMPT, HAIKU, SONNET, anthropic_body, route
+
+LABELS = ("positive", "neutral", "negative")
+
+
+def classify(model_id: str, text: str) -> tuple[str, float, dict]:
+    cfg = route("classify")
+    body = anthropic_body(CLASSIFY_PROMPT.format(text=text.replace("\n", " ")),
+                          cfg["max_tokens"], 0)
+    # llamada directa (sin caché de respuestas) para medir la latencia real
+    t0 = time.perf_counter()
+    resp = get_client("bedrock-runtime").invoke_model(
+        modelId=model_id, body=json.dumps(body),
+        contentType="application/json", accept="application/json")
+    out = json.loads(resp["body"].read())
+    latency = time.perf_counter() - t0
+    words = out["content"][0]["text"].strip().split()
+    label = words[0].lower().strip(".'\"") if words else ""
+    return (label if label in LABELS else "invalid"), latency, out.get("usage", {})
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--parquet", default="data/tweets_fin_2024.parquet")
+    ap.add_argument("--n", type=int, default=200)
+    ap.add_argument("--models", nargs="+", default=[SONNET, HAIKU])
+    args = ap.parse_args()
+
+    df = pd.read_parquet(args.parquet).sample(frac=1, random_state=0).head(args.n)
+    texts = df["text"].astype(str).tolist()
+    gold = df["sentiment"].tolist() if "sentiment" in df else None
+
+    labels = {}
+    for model_id in args.models:
+        preds, lat, tok_in, tok_out = [], [], 0, 0
+        for text in texts:
+            label, latency, usage = classify(model_id, text)
+            preds.append(label)
+            lat.append(latency)
+            tok_in += usage.get("input_tokens", 0)
+            tok_out += usage.get("output_tokens", 0)
+        labels[model_id] = preds
+
+        ref = labels[args.models[0]]
+        row = {
+            "p50_ms": np.percentile(lat, 50) * 1e3,
+            "p99_ms": np.percentile(lat, 99) * 1e3,
+            "tokens_in": tok_in,
+            "tokens_out": tok_out,
+            "invalid": sum(p == "invalid" for p in preds),
+            "agree_ref": np.mean([a == b for a, b in zip(preds, ref)]),
+        }
+        if gold is not None:
+            row["agree_gold"] = np.mean([a == b for a, b in zip(preds, gold)])
+        print(model_id)
+        print("   " + "  ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}"
+                               for k, v in row.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Registra el `Init Duration` (cold start) de un Lambda por artefacto desplegado.
+
+Uso (desde la raíz del repo):
+    python -m tools.init_duration --function bbvaTweetIngestor --hours 24
+    python -m tools.init_duration --log-file report_lines.txt --artifact local-build
+
+Lee las líneas `REPORT ... Init Duration: X ms` de CloudWatch Logs (o de un
+archivo), las agrupa por versión del Lambda (`[$LATEST]`, `[7]` en el nombre
+del log stream) y resuelve cada versión a su CodeSha256: ése es el artefacto.
+Una versión publicada es inmutable; `$LATEST` no, así que sólo cuentan sus
+eventos posteriores al `LastModified` actual (los de despliegues anteriores
+dentro de la ventana se descartan e informan).
+Imprime n / p50 / p90 / máx. y agrega una línea por artefacto al historial
+JSONL (--history). Si el p50 supera al del artefacto anterior en más de
+--max-regression, termina con código 1 (útil en CI tras un despliegue).
+"""
+import argparse
+import datetime as dt
+import json
+import re
+import sys
+import statistics
+import time
+from pathlib import Path
+
+INIT_RE = re.compile(r"Init Duration: ([\d.]+) ms")
+MEM_RE = re.compile(r"Max Memory Used: (\d+) MB")
+VERSION_RE = re.compile(r"\[([^\]]+)\]")
+
+
+def report_events(function: str, hours: float):
+    """(versión, timestamp ms, línea REPORT) de los cold starts en las últimas `hours` horas."""
+    from src.aws_clients import get_client      # --log-file no necesita boto3
+    logs = get_client("logs")
+    kwargs = {
+        "logGroupName": f"/aws/lambda/{function}",
+        "filterPattern": '"Init Duration"',
+        "startTime": int((time.time() - hours * 3600) * 1000),
+    }
+    for page in logs.get_paginator("filter_log_events").paginate(**kwargs):
+        for ev in page["events"]:
+            m = VERSION_RE.search(ev["logStreamName"])
+            yield (m.group(1) if m else "$LATEST"), ev["timestamp"], ev["message"]
+
+
+def code_sha(function: str, version: str) -> tuple[str, int]:
+    """(CodeSha256, LastModified en ms) de `version`."""
+    from src.aws_clients import get_client
+    cfg = get_client("lambda").get_function_configuration(FunctionName=function,
+                                                           Qualifier=version)
+    modified = dt.datetime.strptime(cfg["LastModified"], "%Y-%m-%dT%H:%M:%S.%f%z")
+    return cfg["CodeSha256"], int(modified.timestamp() * 1000)
+
+
+def summarize(lines: list[str]) -> dict:
+    init = sorted(float(m.group(1)) for l in lines if (m := INIT_RE.search(l)))
+    mem = [int(m.group(1)) for l in lines if (m := MEM_RE.search(l))]
+    if not init:
+        return {"n": 0}
+    p90 = statistics.quantiles(init, n=10, method="inclusive")[-1] if len(init) > 1 else init[0]
+    return {
+        "n": len(init),
+        "init_p50_ms": round(statistics.median(init), 1),
+        "init_p90_ms": round(p90, 1),
+        "init_max_ms": round(init[-1], 1),
+        "max_memory_mb": max(mem) if mem else None,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--function", default="bbvaTweetIngestor")
+    ap.add_argument("--hours", type=float, default=24)
+    ap.add_argument("--log-file", help="líneas REPORT guardadas (en vez de CloudWatch)")
+    ap.add_argument("--artifact", help="nombre del artefacto cuando se usa --log-file")
+    ap.add_argument("--history", default="tools/init_duration_history.jsonl")
+    ap.add_argument("--max-regression", type=float, default=0.2)
+    args = ap.parse_args()
+
+    if args.log_file:
+        lines = Path(args.log_file).read_text().splitlines()
+        groups = {args.artifact or Path(args.log_file).stem: lines}
+    else:
+        by_version: dict[str, list[tuple[int, str]]] = {}
+        for version, ts, msg in report_events(args.function, args.hours):
+            by_version.setdefault(version, []).append((ts, msg))
+        groups = {}
+        for version, events in by_version.items():
+            sha, modified = code_sha(args.function, version)
+            if version == "$LATEST":      # mutable: sólo el despliegue vigente
+                stale = sum(ts < modified for ts, _ in events)
+                if stale:
+                    print(f"$LATEST: {stale} cold starts anteriores al despliegue actual "
+                          f"descartados", file=sys.stderr)
+                events = [(ts, msg) for ts, msg in events if ts >= modified]
+            groups.setdefault(f"{version}:{sha}", []).extend(msg for _, msg in events)
+
+    history = Path(args.history)
+    prev = [json.loads(l) for l in history.read_text().splitlines()] if history.exists() else []
+    regressed = False
+    with open(history, "a") as f:
+        for artifact, lines in groups.items():
+            row = {"function": args.function, "artifact": artifact,
+                   "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), **summarize(lines)}
+            if not row["n"]:
+                continue
+            print(json.dumps(row))
+            f.write(json.dumps(row) + "\n")
+            base = next((p for p in reversed(prev) if p["function"] == args.function
+                         and p["artifact"] != artifact), None)
+            if base and row["init_p50_ms"] > base["init_p50_ms"] * (1 + args.max_regression):
+                print(f"REGRESIÓN {artifact}: p50 {row['init_p50_ms']} ms vs "
+                      f"{base['init_p50_ms']} ms ({base['artifact']})", file=sys.stderr)
+                regressed = True
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()